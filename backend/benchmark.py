@@ -0,0 +1,141 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import platform
+import time
+import numpy as np
+from ml.environment import DataCenterEnv
+from ml.predictor import TrafficLSTM
+from ml.agent import RLAgent
+from ml.inference import compare_latency, set_inference_threads
+
+def untrained_predictor_state(num_containers: int, hidden_size: int = 32):
+    model = TrafficLSTM(num_containers, hidden_size, num_containers)
+    return {"model": model.state_dict(), "uncertainty_q": np.zeros(num_containers, dtype=np.float32)}
+
+def time_per_call(fn, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+def latency_stats(samples):
+    samples = np.asarray(samples) * 1000.0
+    return {
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "mean_ms": float(samples.mean()),
+    }
+
+def bench_simulation(env: DataCenterEnv, repeats: int):
+    results = {}
+    actions = [env.action_space.sample() for _ in range(repeats)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for action in actions:
+            env.step(action)
+        elapsed = time.perf_counter() - start
+    results["env_steps_per_sec"] = repeats / elapsed
+
+    step = env.current_step
+    results["generate_temporal_traffic_s"] = time_per_call(
+        lambda: env.traffic_gen.generate_temporal_traffic(step), repeats)
+    env.cost_engine.set_traffic(env.traffic_gen.get_traffic_array())
+    results["calculate_network_cost_s"] = time_per_call(env._calculate_network_cost, repeats)
+    results["network_cost_recompute_s"] = time_per_call(env.cost_engine.recompute, repeats)
+    traffic = env.traffic_gen.get_traffic()
+    results["predictor_predict_s"] = time_per_call(lambda: env.predictor.predict(traffic), repeats)
+    results["get_state_with_traffic_s"] = time_per_call(
+        lambda: env.topology.get_state_with_traffic(traffic), repeats)
+    return results
+
+def bench_inference(env: DataCenterEnv, repeats: int):
+    from stable_baselines3 import PPO
+    agent = RLAgent(env, compile_policy=True)
+    agent.model = PPO("MlpPolicy", env, seed=0)
+    agent.compiled = agent._export(agent.model)
+    env.predictor.compile()
+    return compare_latency(agent, env.predictor, repeats)
+
+def bench_api(env: DataCenterEnv, repeats: int):
+    from fastapi.testclient import TestClient
+    from stable_baselines3 import PPO
+    import main as server
+
+     
+    agent = server.RLAgent(env)
+    agent.model = PPO("MlpPolicy", env, verbose=0)
+    server.env, server.agent = env, agent
+    server.trainer = server.TrainingManager(agent)
+    server.default_session = server.Session("default", env, agent, streamer=server.streamer)
+    server.runner = server.default_session.runner
+    client = TestClient(server.app)
+
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for path, method in (("/api/state", "get"), ("/api/optimize?steps=1", "post")):
+            samples = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                response = getattr(client, method)(path)
+                samples.append(time.perf_counter() - start)
+                response.raise_for_status()
+            results[f"{method.upper()} {path.split('?')[0]}"] = latency_stats(samples)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark simulation, predictor and API hot paths")
+    parser.add_argument("--pods", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--servers-per-pod", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--containers", type=int, nargs="+", default=[20, 100, 500])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--skip-api", action="store_true")
+    parser.add_argument("--skip-inference", action="store_true")
+    parser.add_argument("--inference-threads", type=int, default=None, help="Intra-op threads for inference")
+    parser.add_argument("--server-capacity", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sparse", action="store_true", help="Generate traffic as CSR matrices")
+    parser.add_argument("--chains", default=None, help="Service chain config (JSON) to load instead of the default")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+    if args.inference_threads:
+        set_inference_threads(args.inference_threads)
+
+    runs = []
+    for pods, spp, containers in itertools.product(args.pods, args.servers_per_pod, args.containers):
+        if containers > pods * spp * args.server_capacity:
+            print(f"Skipping pods={pods} servers_per_pod={spp} containers={containers}: exceeds server capacity")
+            continue
+        print(f"Benchmarking pods={pods} servers_per_pod={spp} containers={containers}...")
+        with contextlib.redirect_stdout(io.StringIO()):
+            env = DataCenterEnv(num_containers=containers, seed=args.seed,
+                                predictor_state=untrained_predictor_state(containers),
+                                topology_params={"num_pods": pods, "servers_per_pod": spp,
+                                                 "server_capacity": args.server_capacity},
+                                sparse_traffic=args.sparse, chains_path=args.chains)
+        run = {"num_pods": pods, "servers_per_pod": spp, "num_containers": containers,
+               "server_capacity": args.server_capacity, "sparse": args.sparse}
+        run.update(bench_simulation(env, args.repeats))
+        if not args.skip_inference:
+            run["inference"] = bench_inference(env, args.repeats)
+        if not args.skip_api:
+            run["api"] = bench_api(env, args.repeats)
+        print(f"  {run['env_steps_per_sec']:.1f} steps/s")
+        runs.append(run)
+
+    report = {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeats": args.repeats,
+        "seed": args.seed,
+        "runs": runs,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(runs)} runs to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._timers: Dict[str, Dict[LabelKey, list]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._timers.setdefault(name, {})
+            entry = series.get(key)
+            if entry is None:
+                series[key] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                if seconds > entry[2]:
+                    entry[2] = seconds
+
+    @contextmanager
+    def time(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @staticmethod
+    def _labels(key: LabelKey) -> str:
+        if not key:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in key) + "}"
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{self._labels(key)} {value}")
+            for name, series in sorted(self._timers.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} summary")
+                for key, (count, total, _) in series.items():
+                    labels = self._labels(key)
+                    lines.append(f"{name}_count{labels} {count}")
+                    lines.append(f"{name}_sum{labels} {total}")
+                lines.append(f"# TYPE {name}_max gauge")
+                for key, (_, _, peak) in series.items():
+                    lines.append(f"{name}_max{self._labels(key)} {peak}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe("env_step_phase_seconds", "Time spent in each phase of DataCenterEnv.step")
+REGISTRY.describe("env_steps_total", "Environment steps taken")
+REGISTRY.describe("ppo_phase_seconds", "Time spent collecting rollouts and updating the PPO policy")
+REGISTRY.describe("ppo_timesteps_total", "PPO timesteps collected across all training jobs")
+REGISTRY.describe("inference_seconds", "Policy and predictor forward-pass latency by backend")
+REGISTRY.describe("api_request_seconds", "API handler latency by route")
+REGISTRY.describe("api_requests_total", "API requests by route and status code")
@@ -1,14 +1,43 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, PlainTextResponse, Response
 from simulation.topology import NetworkTopology
 from simulation.traffic import TrafficGenerator
 from ml.environment import DataCenterEnv
 from ml.agent import RLAgent
+from ml.training import TrainingManager
+from ml.model_store import ModelStore
+from ml.placement import PlacementOptimizer
+from ml.inference import compare_latency, set_inference_threads
 from models import TopologyState, OptimizationResult
+from streaming import StateStreamer
+from sessions import (Session, SessionPool, ProcessSessionPool, SharedAssets,
+                      SessionNotFound, TickBudgetExceeded)
+from runner import AutoPlayer, RunnerStopped
+from typing import Any, Dict, Optional
+from instrumentation import REGISTRY
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import logging
+import os
 import uvicorn
+import time
+import uuid
 
-app = FastAPI()
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+     
+     
+    startup()
+    try:
+        yield
+    finally:
+        shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,90 +47,319 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-env = DataCenterEnv()
-agent = RLAgent(env)
+NUM_PODS = 4
+SERVERS_PER_POD = 4
+NUM_CONTAINERS = 20
+HISTORY_LEN = 5
+SEED = None
+LOOKAHEAD_WORKERS = int(os.environ.get("LOOKAHEAD_WORKERS", "0"))
+TRAIN_ENVS = int(os.environ.get("TRAIN_ENVS", "4"))
+TRAIN_SUBPROCESS = os.environ.get("TRAIN_SUBPROCESS", "1") != "0"
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "torchscript")
+INFERENCE_THREADS = os.environ.get("INFERENCE_THREADS")
+SESSION_POLL_SECONDS = 0.05
+
+def _warm_start():
+    start = time.time()
+    store = ModelStore()
+    traffic = TrafficGenerator(NUM_CONTAINERS, seed=SEED)
+    key = ModelStore.key_for(NUM_PODS, SERVERS_PER_POD, NUM_CONTAINERS, HISTORY_LEN, SEED,
+                             traffic_fingerprint=traffic.fingerprint())
+    meta = store.load_meta(key)
+    predictor_state = store.load_predictor(key)
+    env = DataCenterEnv(NUM_PODS, SERVERS_PER_POD, NUM_CONTAINERS, seed=SEED,
+                        predictor_state=predictor_state, history_len=HISTORY_LEN)
+    if predictor_state is None:
+        store.save_predictor(key, env.predictor)
+    compiled = INFERENCE_BACKEND == "torchscript"
+    if compiled:
+        env.predictor.compile(store.compiled_path(key, "predictor"))
+    agent = RLAgent(env, n_envs=TRAIN_ENVS, use_subprocess=TRAIN_SUBPROCESS, model_path=store.policy_path(key),
+                    model_store=store, model_key=key, compile_policy=compiled)
+    policy_loaded = agent.load()
+
+    saved = 0.0
+    if predictor_state is not None:
+        saved += meta.get("predictor_train_seconds", 0.0)
+    if policy_loaded:
+        saved += meta.get("policy_train_seconds", 0.0)
+    elapsed = time.time() - start
+    report = {
+        "model_key": key,
+        "predictor_loaded": predictor_state is not None,
+        "policy_loaded": policy_loaded,
+        "predictor_compiled": env.predictor.compiled is not None,
+        "policy_compiled": agent.compiled is not None,
+        "startup_seconds": elapsed,
+        "seconds_saved": max(0.0, saved - elapsed),
+    }
+    print(f"Startup: key={key} predictor_loaded={report['predictor_loaded']} "
+          f"policy_loaded={policy_loaded} took {elapsed:.2f}s, saved ~{report['seconds_saved']:.2f}s")
+    return env, agent, report
+
+def _session_pool():
+    workers = int(os.environ.get("SESSION_WORKERS", "0"))
+    pool_kwargs = {
+        "max_bytes": int(float(os.environ.get("SESSION_MEMORY_MB", "512")) * 2**20),
+        "max_sessions": int(os.environ.get("SESSION_MAX", "256")),
+        "tick_rate": float(os.environ.get("SESSION_TICKS_PER_SECOND", "50")),
+        "tick_burst": float(os.environ.get("SESSION_TICK_BURST", "500")),
+        "lookahead_workers": LOOKAHEAD_WORKERS,
+    }
+    if workers > 0:
+        config = {"num_pods": NUM_PODS, "servers_per_pod": SERVERS_PER_POD, "num_containers": NUM_CONTAINERS,
+                  "seed": SEED, "history_len": HISTORY_LEN}
+        return ProcessSessionPool(workers, config, env.predictor.get_state(), agent.model_path,
+                                  compiled=env.predictor.compiled is not None, on_evict=_stop_autoplay,
+                                  **pool_kwargs)
+    return SessionPool(SharedAssets(env, agent), on_evict=_stop_autoplay, **pool_kwargs)
+
+def _stop_autoplay(session_id: str):
+    player = autoplayers.pop(session_id, None)
+    if player is not None:
+        player.pause()
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    REGISTRY.observe("api_request_seconds", time.perf_counter() - start, route=path, method=request.method)
+    REGISTRY.inc("api_requests_total", route=path, method=request.method, status=str(response.status_code))
+    return response
+
+env: Optional[DataCenterEnv] = None
+agent: Optional[RLAgent] = None
+startup_report: Dict[str, Any] = {}
+trainer: Optional[TrainingManager] = None
+streamer = StateStreamer()
+autoplayers: Dict[Optional[str], AutoPlayer] = {}
+pool = None
+default_session: Optional[Session] = None
+runner = None
+
+def startup():
+    global env, agent, startup_report, trainer, pool, default_session, runner
+    env, agent, startup_report = _warm_start()
+    if INFERENCE_THREADS:
+        set_inference_threads(int(INFERENCE_THREADS))
+    trainer = TrainingManager(agent)
+    pool = _session_pool()
+    default_session = Session("default", env, agent, streamer=streamer, lookahead_workers=LOOKAHEAD_WORKERS)
+    runner = default_session.runner
+
+def shutdown():
+    for player in list(autoplayers.values()):
+        player.pause()
+    autoplayers.clear()
+    if pool is not None:
+        pool.close()
+    if default_session is not None:
+        default_session.close()
+
+def run_command(session_id: Optional[str], name: str, **kwargs):
+    try:
+        if session_id is None:
+            return default_session.run(name, **kwargs)
+        return pool.call(session_id, name, **kwargs)
+    except TickBudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except RunnerStopped:
+        raise HTTPException(status_code=409, detail="Session was evicted or deleted")
+    except SessionNotFound:
+        raise HTTPException(status_code=404, detail="Session not found")
 
 @app.get("/")
 def read_root():
     return RedirectResponse(url="/docs")
 
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/startup")
+def get_startup_report():
+    return startup_report
+
+@app.get("/api/inference")
+def get_inference_latency(repeats: int = 200):
+    return compare_latency(agent, env.predictor, max(1, min(repeats, 10000)))
+
 @app.get("/api/state", response_model=TopologyState)
-def get_state():
-    return env.get_current_state()
+def get_state(session_id: Optional[str] = None):
+    body = runner.snapshot.body if session_id is None else pool.snapshot_body(session_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return Response(content=body, media_type="application/json")
 
 @app.post("/api/reset")
-def reset_simulation():
-    env.reset()
-    return {"message": "Simulation reset", "state": env.get_current_state()}
+def reset_simulation(session_id: Optional[str] = None):
+    return run_command(session_id, "reset")
 
 @app.post("/api/optimize")
-def optimize_network(steps: int = 10):
-    initial_cost = env._calculate_network_cost()
-    if not agent.model:
+def optimize_network(steps: int = 10, optimizer: str = "ppo", time_budget_ms: int = 500,
+                     width: int = 8, depth: int = 1, session_id: Optional[str] = None):
+    if optimizer not in ("ppo", "lookahead") and optimizer not in PlacementOptimizer.methods:
+        raise HTTPException(status_code=400, detail=f"Unknown optimizer '{optimizer}'")
+    if width < 1 or depth < 1:
+        raise HTTPException(status_code=400, detail="width and depth must be positive")
+    if steps < 0:
+        raise HTTPException(status_code=400, detail="steps must be non-negative")
+    training_job = None
+    if optimizer == "ppo" and not agent.model:
          
          
-        agent.train(total_timesteps=20000)
-        env.reset()
-    
-     
-    env.traffic_gen.steps_per_epoch = steps
-    
-    obs = env._get_obs()
-    last_info = {}
-    
-     
-     
-    for _ in range(steps):
-        action = agent.predict(obs)
-        obs, reward, terminated, truncated, last_info = env.step(action)
-        
-    final_cost = env._calculate_network_cost()
-    
-     
-    if "active_servers" not in last_info:
-        active_servers = list(set(env.topology.containers.values()))
-        last_info["active_servers"] = active_servers
-        last_info["energy_cost"] = len(active_servers) * 100.0  
+        training_job = trainer.start(total_timesteps=20000)
+    result = run_command(session_id, "optimize", steps=steps, optimizer=optimizer, time_budget_ms=time_budget_ms,
+                         width=width, depth=depth)
+    result["training_job"] = training_job.to_dict() if training_job else None
+    return result
 
-     
-    metrics = {
-        "step": env.current_step,
-        "reward": float(last_info.get("reward", 0)),  
-        "network_cost": float(last_info.get("network_cost", 0)),
-        "energy_cost": float(last_info.get("energy_cost", 0)),
-        "active_servers": last_info.get("active_servers", 0),
-        "active_chains": last_info.get("active_chains", [])
-    }
-    
-    return {
-        "initial_cost": initial_cost,
-        "final_cost": final_cost,
-        "steps_taken": steps,
-        "final_state": env.get_current_state(),
-        "metrics": metrics  
-    }
+@app.post("/api/train")
+def start_training(timesteps: int = 20000):
+    job = trainer.start(total_timesteps=timesteps)
+    return job.to_dict()
+
+@app.get("/api/train/{job_id}")
+def get_training_status(job_id: str):
+    job = trainer.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job.to_dict()
 
 @app.post("/api/burst")
-def trigger_burst():
-    new_cost = env.trigger_burst()
-    return {
-        "message": "Traffic burst triggered!",
-        "new_cost": new_cost,
-        "state": env.get_current_state()
-    }
+def trigger_burst(session_id: Optional[str] = None):
+    return run_command(session_id, "burst")
 
 @app.post("/api/force_chain")
-def force_chain():
-     
-     
-    env.traffic_gen.chains[0].start()
-    
-     
-    obs = env._get_obs()
-    action = agent.predict(obs)
-    env.step(action)
-    
-    return {"message": "Login Flow FORCE STARTED", "state": env.get_current_state()}
+def force_chain(chain: Optional[str] = None, session_id: Optional[str] = None):
+    try:
+        return run_command(session_id, "force_chain", chain=chain)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _autoplay_tick(session_id: Optional[str], player: AutoPlayer):
+    try:
+        if session_id is None:
+            return default_session.run("tick", steps=player.steps_per_tick)
+         
+        return pool.call(session_id, "tick", create=False, steps=player.steps_per_tick)
+    except TickBudgetExceeded:
+        return False
+    except (SessionNotFound, RunnerStopped):
+        _stop_autoplay(session_id)
+        return False
+
+def _autoplayer(session_id: Optional[str]) -> AutoPlayer:
+    player = autoplayers.get(session_id)
+    if player is None:
+        player = AutoPlayer(lambda: _autoplay_tick(session_id, player))
+        autoplayers[session_id] = player
+    return player
+
+@app.get("/api/autoplay")
+def autoplay_status(session_id: Optional[str] = None):
+    player = autoplayers.get(session_id)
+    return player.status() if player else {"running": False}
+
+@app.post("/api/autoplay/start")
+def autoplay_start(tick_rate: Optional[float] = None, steps_per_tick: int = 1, session_id: Optional[str] = None):
+    if steps_per_tick < 1:
+        raise HTTPException(status_code=400, detail="steps_per_tick must be positive")
+    if session_id is not None and pool.snapshot_body(session_id) is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    player = _autoplayer(session_id)
+    autoplay_speed(tick_rate if tick_rate is not None else player.tick_rate, session_id)
+    player.steps_per_tick = steps_per_tick
+    training_job = None
+    if not agent.model:
+         
+        training_job = trainer.start(total_timesteps=20000)
+    player.start()
+    status = player.status()
+    status["training_job"] = training_job.to_dict() if training_job else None
+    return status
+
+@app.post("/api/autoplay/pause")
+def autoplay_pause(session_id: Optional[str] = None):
+    player = autoplayers.get(session_id)
+    if player is None:
+        return {"running": False}
+    player.pause()
+    return player.status()
+
+@app.post("/api/autoplay/speed")
+def autoplay_speed(tick_rate: float, session_id: Optional[str] = None):
+    player = _autoplayer(session_id)
+    try:
+        player.set_speed(tick_rate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return player.status()
+
+@app.get("/api/sessions")
+def list_sessions():
+    return pool.stats()
+
+@app.post("/api/sessions")
+def create_session():
+    session_id = uuid.uuid4().hex
+    result = run_command(session_id, "reset")
+    return {"session_id": session_id, "state": result["state"]}
+
+@app.delete("/api/sessions/{session_id}")
+def delete_session(session_id: str):
+    _stop_autoplay(session_id)
+    if not pool.drop(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, "deleted": True}
+
+async def _poll_session(websocket: WebSocket, session_id: str):
+    last = None
+    try:
+        while True:
+            body = pool.snapshot_body(session_id)
+            if body is None:
+                await websocket.close(code=1008, reason="Session not found")
+                return
+            if body is not last:
+                last = body
+                await websocket.send_json(StateStreamer.snapshot_from_state(json.loads(body)))
+            await asyncio.sleep(SESSION_POLL_SECONDS)
+    except WebSocketDisconnect:
+        pass
+
+@app.websocket("/api/ws")
+async def stream_state(websocket: WebSocket, session_id: Optional[str] = None):
+    await websocket.accept()
+    if session_id is not None and not isinstance(pool, SessionPool):
+         
+        await _poll_session(websocket, session_id)
+        return
+    session = default_session if session_id is None else pool.get(session_id, create=False)
+    if session is None:
+        await websocket.close(code=1008, reason="Session not found")
+        return
+    session_runner = session.runner
+    session_streamer = session_runner.streamer
+    loop = asyncio.get_running_loop()
+    try:
+        sub = await asyncio.wrap_future(session_runner.submit(lambda env: session_streamer.subscribe(env, loop)))
+    except RunnerStopped:
+        await websocket.close(code=1008, reason="Session not found")
+        return
+    try:
+        while True:
+            message = await sub.next()
+            if message["type"] == "closed":
+                await websocket.close(code=1001, reason="Session closed")
+                return
+            await websocket.send_json(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        session_streamer.unsubscribe(sub)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", "8000")))
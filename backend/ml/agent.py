@@ -1,28 +1,154 @@
 from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
 from ml.environment import DataCenterEnv
+from ml.inference import CompiledPolicy, export_policy, timed_call
+from ml.model_store import atomic_write
+from typing import Optional
+import copy
+import logging
+import numpy as np
 import os
+import time
+
+logger = logging.getLogger(__name__)
+
+def make_env(num_pods: int, servers_per_pod: int, num_containers: int, seed: int, predictor_state=None,
+             history_len: int = 5, obs_buffer=None, topology_kind: str = "tree", topology_params=None,
+             trace_path: Optional[str] = None, sparse_traffic: bool = False, chains_path: Optional[str] = None):
+    def _init():
+        env = DataCenterEnv(num_pods, servers_per_pod, num_containers, seed=seed,
+                            predictor_state=predictor_state, history_len=history_len, obs_buffer=obs_buffer,
+                            topology_kind=topology_kind, topology_params=topology_params, trace_path=trace_path,
+                            sparse_traffic=sparse_traffic, chains_path=chains_path)
+        env.reset(seed=seed)
+        return env
+    return _init
+
+class BatchedVecEnv(DummyVecEnv):
+     
+     
+    def __init__(self, env_fns, obs_batch: Optional[np.ndarray] = None):
+        super().__init__(env_fns)
+        self.shared_obs = obs_batch is not None
+        if self.shared_obs:
+             
+            self.buf_obs[None] = obs_batch
+
+    def _save_obs(self, env_idx: int, obs):
+        if not (self.shared_obs and obs is self.envs[env_idx].unwrapped.obs_buffer):
+            super()._save_obs(env_idx, obs)
+
+    def step_wait(self):
+        envs = [env.unwrapped for env in self.envs]
+        moved = [env.begin_step(action) for env, action in zip(envs, self.actions)]
+        envs[0].predictor.predict_many([env.predictor for env in envs], [env.current_traffic for env in envs],
+                                       [env.current_step for env in envs])
+        for env_idx, env in enumerate(envs):
+            obs, self.buf_rews[env_idx], terminated, truncated, self.buf_infos[env_idx] = env.finish_step(moved[env_idx])
+            self.buf_dones[env_idx] = terminated or truncated
+            self.buf_infos[env_idx]["TimeLimit.truncated"] = truncated and not terminated
+            if self.buf_dones[env_idx]:
+                self.buf_infos[env_idx]["terminal_observation"] = np.array(obs)
+                obs, self.reset_infos[env_idx] = self.envs[env_idx].reset()
+            self._save_obs(env_idx, obs)
+        return self._obs_from_buf(), np.copy(self.buf_rews), np.copy(self.buf_dones), copy.deepcopy(self.buf_infos)
 
 class RLAgent:
-    def __init__(self, env: DataCenterEnv):
+    def __init__(self, env: DataCenterEnv, n_envs: int = 4, use_subprocess: bool = True,
+                 seed: int = 0, start_method: Optional[str] = None, model_path: str = "ppo_datacenter_agent",
+                 model_store=None, model_key: Optional[str] = None, compile_policy: bool = False):
         self.env = env
         self.model = None
-        self.model_path = "ppo_datacenter_agent"
+        self.compiled: Optional[CompiledPolicy] = None
+        self.compile_policy = compile_policy
+        self.model_path = model_path
+        self.model_store = model_store
+        self.model_key = model_key
+        self.train_seconds = 0.0
+        self.n_envs = max(1, n_envs)
+        self.use_subprocess = use_subprocess
+        self.seed = seed
+        self.start_method = start_method
 
-    def train(self, total_timesteps=10000):
-        self.model = PPO("MlpPolicy", self.env, verbose=1)
-        self.model.learn(total_timesteps=total_timesteps)
-        self.model.save(self.model_path)
+    def make_training_env(self):
+         
+         
+        predictor_state = self.env.predictor.get_state()
+        use_subprocess = self.use_subprocess and self.n_envs > 1
+         
+         
+        obs_batch = None
+        if not use_subprocess:
+            obs_batch = np.zeros((self.n_envs,) + self.env.observation_space.shape, dtype=np.float32)
+        env_fns = [
+            make_env(self.env.num_pods, self.env.servers_per_pod, self.env.num_containers,
+                     seed=self.seed + rank, predictor_state=predictor_state,
+                     history_len=self.env.predictor.history_len,
+                     obs_buffer=obs_batch[rank] if obs_batch is not None else None,
+                     topology_kind=self.env.topology_kind, topology_params=self.env.topology_params,
+                     trace_path=self.env.trace_path, sparse_traffic=self.env.traffic_gen.sparse_traffic,
+                     chains_path=self.env.traffic_gen.chains_path)
+            for rank in range(self.n_envs)
+        ]
+        if use_subprocess:
+            return SubprocVecEnv(env_fns, start_method=self.start_method)
+        return BatchedVecEnv(env_fns, obs_batch)
+
+    def train(self, total_timesteps=10000, callback=None):
+        start = time.time()
+        vec_env = self.make_training_env()
+        try:
+            model = PPO("MlpPolicy", vec_env, verbose=1, seed=self.seed)
+            model.learn(total_timesteps=total_timesteps, callback=callback)
+            with atomic_write(f"{self.model_path}.zip") as f:
+                model.save(f)
+        finally:
+            vec_env.close()
+        self.train_seconds = time.time() - start
+        if self.model_store is not None:
+            self.model_store.record(self.model_key, policy_train_seconds=self.train_seconds)
+        compiled = self._export(model)
+         
+        self.model = model
+        self.compiled = compiled
 
     def load(self):
         if os.path.exists(f"{self.model_path}.zip"):
-            self.model = PPO.load(self.model_path, env=self.env)
+            try:
+                model = PPO.load(self.model_path, env=self.env)
+            except ValueError as e:
+                 
+                logger.warning("Ignoring incompatible policy %s: %s", self.model_path, e)
+                return False
+            compiled = self._export(model)
+            self.model = model
+            self.compiled = compiled
             return True
         return False
 
+    def _export(self, model) -> Optional[CompiledPolicy]:
+        if not self.compile_policy:
+            return None
+        try:
+            path = self.model_store.compiled_path(self.model_key, "policy") if self.model_store is not None else None
+            module = export_policy(model.policy, path)
+        except Exception as e:
+            logger.warning("Policy export failed, using eager inference: %s", e)
+            return None
+        return CompiledPolicy(module, self.env.observation_space.shape)
+
     def predict(self, obs):
-        if self.model:
+        compiled = self.compiled
+        if compiled is not None:
+            try:
+                return timed_call("policy", "torchscript", lambda: compiled(obs))
+            except Exception as e:
+                logger.warning("Compiled policy failed, falling back to eager: %s", e)
+                self.compiled = None
+        model = self.model
+        if model:
              
              
-            action, _ = self.model.predict(obs, deterministic=False)
+            action, _ = timed_call("policy", "eager", lambda: model.predict(obs, deterministic=False))
             return action
         return self.env.action_space.sample() 
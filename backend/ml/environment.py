@@ -1,23 +1,48 @@
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
-from simulation.topology import NetworkTopology
+import logging
+import time
+from instrumentation import REGISTRY
+from simulation.topology import build_topology
 from simulation.traffic import TrafficGenerator
+from simulation.cost import CostEngine
 from ml.predictor import TrafficPredictor
 
+logger = logging.getLogger(__name__)
+
 class DataCenterEnv(gym.Env):
-    def __init__(self, num_pods=4, servers_per_pod=4, num_containers=20):
+    log_every = 100
+
+    def __init__(self, num_pods=4, servers_per_pod=4, num_containers=20, seed=None, predictor_state=None, history_len=5,
+                 obs_buffer=None, topology_kind="tree", topology_params=None, trace_path=None, sparse_traffic=False,
+                 chains_path=None):
         super(DataCenterEnv, self).__init__()
         
-        self.num_pods = num_pods
-        self.servers_per_pod = servers_per_pod
         self.num_containers = num_containers     
-        self.topology = NetworkTopology(num_pods, servers_per_pod)
-        self.traffic_gen = TrafficGenerator(num_containers)
-        
-         
-        self.predictor = TrafficPredictor(num_containers)
-        self.predictor.train(self.traffic_gen)
+        self.topology_kind = topology_kind
+        if topology_params is None and topology_kind == "tree":
+            topology_params = {"num_pods": num_pods, "servers_per_pod": servers_per_pod}
+        self.topology_params = dict(topology_params or {})
+        self.topology = build_topology(topology_kind, seed=seed, **self.topology_params)
+        self.num_pods = self.topology.num_pods
+        self.servers_per_pod = self.topology.servers_per_pod
+        if num_containers > int(self.topology.server_capacity.sum()):
+            raise ValueError(f"{num_containers} containers exceed total server capacity {int(self.topology.server_capacity.sum())}")
+        self.traffic_gen = TrafficGenerator(num_containers, seed=seed, sparse_traffic=sparse_traffic,
+                                            chains_path=chains_path)
+        self.trace_path = trace_path
+        if trace_path is not None:
+            self.traffic_gen.load_trace(trace_path)
+        self.cost_engine = CostEngine(self.topology)
+        
+         
+        self.seed = seed
+        self.predictor = TrafficPredictor(num_containers, history_len=history_len)
+        if predictor_state is not None:
+            self.predictor.load_state(predictor_state)
+        else:
+            self.predictor.train(self.traffic_gen)
         
         self.servers = self.topology.servers
         self.num_servers = len(self.servers)
@@ -27,16 +52,22 @@ class DataCenterEnv(gym.Env):
         self.observation_space = spaces.Box(
             low=0, 
             high=np.inf, 
-            shape=(3 * num_containers,), 
+            shape=(3 * num_containers + self.num_servers,), 
             dtype=np.float32
         )
         
+         
+         
+        self.obs_buffer = obs_buffer if obs_buffer is not None else np.zeros(self.observation_space.shape, dtype=np.float32)
         self.current_traffic = None
         self.current_step = 0
         self.reset()
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
+        if seed is not None:
+            self.topology.seed(seed)
+            self.traffic_gen.seed(seed)
         self.current_step = 0
         self.topology.place_containers(self.num_containers)
         self.traffic_gen.reset()
@@ -45,42 +76,55 @@ class DataCenterEnv(gym.Env):
          
         self.traffic_gen.generate_temporal_traffic(self.current_step)
         self.current_traffic = self.traffic_gen.get_traffic()
+        self.cost_engine.set_traffic(self.traffic_gen.get_traffic_array())
         
          
-        self.predictor.predict(self.current_traffic)
+        self.predictor.predict(self.current_traffic, step=self.current_step)
         
         return self._get_obs(), {"step": self.current_step}
 
     def get_current_state(self):
         state = self.topology.get_state_with_traffic(self.current_traffic)
         state["step"] = self.current_step
+        state["network_cost"] = float(self.cost_engine.network_cost)
         state["active_chains"] = self.traffic_gen.get_active_chains()
          
-        state["active_servers"] = list(set(self.topology.containers.values()))
-         
-        container_chains = {}
-        for chain in self.traffic_gen.chains:
-            for container_id in chain.nodes:
-                container_chains[container_id] = chain.name
-        
-        state["container_chains"] = container_chains
+        state["active_servers"] = list(self.topology.active_servers)
+        state["container_chains"] = self.traffic_gen.chains.container_chains
         return state
 
     def step(self, action):
+        return self.finish_step(self.begin_step(action))
+
+    def begin_step(self, action) -> bool:
+         
+         
         self.current_step += 1
         container_idx, server_idx = action
-        container_id = f"Container_{container_idx}"
-        new_server_id = self.servers[server_idx]
-        self.topology.move_container(container_id, new_server_id)
+        t0 = time.perf_counter()
+        moved = self.topology.has_room(self.servers[server_idx]) or self.topology.placement[container_idx] == server_idx
+        self.cost_engine.apply_move(int(container_idx), int(server_idx))
+        t1 = time.perf_counter()
         self.traffic_gen.generate_temporal_traffic(self.current_step)
         self.current_traffic = self.traffic_gen.get_traffic()
-        pred_traffic, uncertainty = self.predictor.predict(self.current_traffic)
-        network_cost = self._calculate_network_cost()
+        t2 = time.perf_counter()
+        REGISTRY.observe("env_step_phase_seconds", t1 - t0, phase="action")
+        REGISTRY.observe("env_step_phase_seconds", t2 - t1, phase="traffic")
+        return moved
+
+    def finish_step(self, moved: bool):
+        t2 = time.perf_counter()
+        pred_traffic, uncertainty = self.predictor.predict(self.current_traffic, step=self.current_step)
+        t3 = time.perf_counter()
+         
+        self.cost_engine.set_traffic(self.traffic_gen.get_traffic_array())
+        t4 = time.perf_counter()
+        network_cost = self.cost_engine.network_cost
+        locality_bonus = self.cost_engine.locality_bonus
         risk_penalty = np.sum(uncertainty) * 0.1
         
          
-        active_servers = set(self.topology.containers.values())
-        num_active_servers = len(active_servers)
+        num_active_servers = len(self.topology.active_servers)
         
          
         energy_cost = 0.0
@@ -89,23 +133,11 @@ class DataCenterEnv(gym.Env):
          
          
         scaled_network_cost = network_cost / 100000.0
-        
-         
-         
-        locality_bonus = 0.0
-        for src, dests in self.current_traffic.items():
-            src_srv = self.topology.containers[src]
-            for dst, vol in dests.items():
-                if vol > 0 and dst in self.topology.containers:
-                    dst_srv = self.topology.containers[dst]
-                    dst_srv = self.topology.containers[dst]
-                    if src_srv == dst_srv:
-                         
-                         
-                        locality_bonus += 100.0
 
          
-        print(f"Step {self.current_step}: NetCost={network_cost:.0f}, Scaled={scaled_network_cost:.2f}, Bonus={locality_bonus:.1f}")
+        if self.current_step % self.log_every == 0 and logger.isEnabledFor(logging.INFO):
+            logger.info("Step %d: NetCost=%.0f, Scaled=%.2f, Bonus=%.1f",
+                        self.current_step, network_cost, scaled_network_cost, locality_bonus)
         
          
         reward = -scaled_network_cost + locality_bonus
@@ -115,39 +147,53 @@ class DataCenterEnv(gym.Env):
         
         terminated = False
         truncated = False
+        obs = self._get_obs()
+        t5 = time.perf_counter()
+
+        REGISTRY.observe("env_step_phase_seconds", t3 - t2, phase="predict")
+        REGISTRY.observe("env_step_phase_seconds", t4 - t3, phase="cost")
+        REGISTRY.observe("env_step_phase_seconds", t5 - t4, phase="observation")
+        REGISTRY.inc("env_steps_total")
         
-        return self._get_obs(), reward, terminated, truncated, {
+        return obs, reward, terminated, truncated, {
             "cost": float(total_cost), 
             "network_cost": float(network_cost),
             "energy_cost": float(energy_cost),
             "active_servers": int(num_active_servers),
+            "move_rejected": not moved,
             "step": int(self.current_step)
         }
 
     def _get_obs(self):
-         
-        placements = np.zeros(self.num_containers, dtype=np.float32)
-        for i in range(self.num_containers):
-            c_id = f"Container_{i}"
-            s_id = self.topology.containers[c_id]
-            s_idx = self.servers.index(s_id)
-            placements[i] = s_idx
+        n = self.num_containers
+        obs = self.obs_buffer
+        obs[:n] = self.topology.placement
             
          
-        pred_traffic, uncertainty = self.predictor.predict(self.current_traffic)
-        
-        return np.concatenate([placements, pred_traffic, uncertainty])
+        pred_traffic, uncertainty = self.predictor.predict(self.current_traffic, step=self.current_step)
+        obs[n:2 * n] = pred_traffic
+        obs[2 * n:3 * n] = uncertainty
+        obs[3 * n:] = self.topology.occupancy / self.topology.server_capacity
+        return obs
+
+    def action_masks(self):
+         
+         
+        server_mask = self.topology.occupancy < self.topology.server_capacity
+        return np.concatenate([np.ones(self.num_containers, dtype=bool), server_mask])
+
+    def noop_action(self):
+        return np.array([0, self.topology.placement[0]])
+
+    def trigger_burst(self):
+        self.traffic_gen.inject_burst()
+        self.current_traffic = self.traffic_gen.get_traffic()
+        self.predictor.revise(self.current_traffic, step=self.current_step)
+        self.cost_engine.set_traffic(self.traffic_gen.get_traffic_array())
+        return self._calculate_network_cost()
 
     def _calculate_network_cost(self):
-        total_cost = 0
-        for src_id, destinations in self.current_traffic.items():
-            src_server = self.topology.containers[src_id]
-            for dst_id, volume in destinations.items():
-                if dst_id in self.topology.containers:
-                    dst_server = self.topology.containers[dst_id]
-                    distance = self.topology.get_distance(src_server, dst_server)
-                    total_cost += volume * distance
-        return total_cost
+        return self.cost_engine.network_cost
 
     def render(self):
         print(f"Current Network Cost: {self._calculate_network_cost()}")
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+import warnings
+import numpy as np
+import torch
+import torch.nn as nn
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from instrumentation import REGISTRY
+from ml.model_store import atomic_write
+
+logger = logging.getLogger(__name__)
+
+def set_inference_threads(threads: int):
+    torch.set_num_threads(max(1, threads))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+         
+        pass
+
+def input_buffer(shape: Tuple[int, ...]) -> torch.Tensor:
+    buffer = torch.zeros(shape)
+    return buffer.pin_memory() if torch.cuda.is_available() else buffer
+
+class PolicyModule(nn.Module):
+    splits: List[int]
+
+    def __init__(self, policy):
+        super().__init__()
+        self.features = policy.pi_features_extractor
+        self.policy_net = policy.mlp_extractor.policy_net
+         
+        head = policy.action_net
+        self.action_net = nn.Linear(int(head.in_features), int(head.out_features))
+        self.action_net.load_state_dict(head.state_dict())
+        self.splits = [int(n) for n in policy.action_space.nvec]
+
+    def forward(self, obs: torch.Tensor, deterministic: bool) -> torch.Tensor:
+        logits = self.action_net(self.policy_net(self.features(obs)))
+        actions = []
+        for chunk in torch.split(logits, self.splits, dim=1):
+            if not deterministic:
+                 
+                noise = torch.rand_like(chunk).clamp_(1e-10, 1.0)
+                chunk = chunk - torch.log(-torch.log(noise))
+            actions.append(torch.argmax(chunk, dim=1))
+        return torch.stack(actions, dim=1)
+
+def _optimize(module: torch.jit.ScriptModule) -> torch.jit.ScriptModule:
+    module = torch.jit.freeze(module.eval())
+    try:
+        return torch.jit.optimize_for_inference(module)
+    except Exception as e:
+        logger.info("optimize_for_inference unavailable, using frozen module: %s", e)
+        return module
+
+def export_module(module: nn.Module, path: Optional[str] = None) -> torch.jit.ScriptModule:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        scripted = torch.jit.script(module.eval())
+        if path is None:
+            return _optimize(scripted)
+        with atomic_write(path) as f:
+            torch.jit.save(scripted, f)
+        return _optimize(torch.jit.load(path))
+
+def export_policy(policy, path: Optional[str] = None) -> torch.jit.ScriptModule:
+    return export_module(PolicyModule(policy), path)
+
+class CompiledPolicy:
+    def __init__(self, module: torch.jit.ScriptModule, obs_shape: Tuple[int, ...]):
+        self.module = module
+        self.shape = (1,) + tuple(obs_shape)
+        self._local = threading.local()
+
+    def _buffer(self) -> torch.Tensor:
+         
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = self._local.buffer = input_buffer(self.shape)
+        return buffer
+
+    def __call__(self, obs: np.ndarray, deterministic: bool = False) -> np.ndarray:
+        buffer = self._buffer()
+        buffer[0].copy_(torch.from_numpy(np.asarray(obs, dtype=np.float32)))
+        with torch.inference_mode():
+            return self.module(buffer, deterministic)[0].numpy()
+
+def timed_call(model: str, backend: str, fn: Callable[[], Any]):
+    start = time.perf_counter()
+    result = fn()
+    REGISTRY.observe("inference_seconds", time.perf_counter() - start, model=model, backend=backend)
+    return result
+
+def measure_latency(fn: Callable[[], Any], repeats: int = 200, warmup: int = 10) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - start
+    samples *= 1e6
+    return {
+        "p50_us": float(np.percentile(samples, 50)),
+        "p99_us": float(np.percentile(samples, 99)),
+        "mean_us": float(samples.mean()),
+    }
+
+def compare_latency(agent, predictor, repeats: int = 200) -> Dict[str, Dict[str, Any]]:
+    report: Dict[str, Dict[str, Any]] = {"threads": {"intra_op": torch.get_num_threads()}}
+    obs = np.zeros(agent.env.observation_space.shape, dtype=np.float32)
+    if agent.model is not None:
+        report["policy"] = {"eager": measure_latency(lambda: agent.model.predict(obs, deterministic=False), repeats)}
+        if agent.compiled is not None:
+            report["policy"]["torchscript"] = measure_latency(lambda: agent.compiled(obs), repeats)
+    window = torch.zeros(1, predictor.history_len, predictor.num_containers)
+
+    def eager():
+        with torch.inference_mode():
+            return predictor.model(window)
+    report["predictor"] = {"eager": measure_latency(eager, repeats)}
+    if predictor.compiled is not None:
+        def compiled():
+            with torch.inference_mode():
+                return predictor.compiled(window)
+        report["predictor"]["torchscript"] = measure_latency(compiled, repeats)
+    return report
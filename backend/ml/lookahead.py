@@ -0,0 +1,172 @@
+import copy
+import logging
+import multiprocessing as mp
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from ml.placement import planning_weights
+from simulation.cost import placement_move_deltas
+
+Action = Tuple[int, int]
+
+logger = logging.getLogger(__name__)
+
+_executors: Dict[int, ProcessPoolExecutor] = {}
+
+def _executor(workers: int) -> ProcessPoolExecutor:
+    executor = _executors.get(workers)
+    if executor is None:
+        method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context(method))
+        _executors[workers] = executor
+    return executor
+
+def _placement_cost(W: np.ndarray, D: np.ndarray, p: np.ndarray) -> float:
+    return float((W * D[p[:, None], p[None, :]]).sum()) / 2.0
+
+def _best_move(W: np.ndarray, D: np.ndarray, p: np.ndarray, load: np.ndarray,
+               capacity: np.ndarray) -> Optional[Action]:
+    _, delta = placement_move_deltas(D, p, W, blocked=load >= capacity)
+    c, s = np.unravel_index(np.argmin(delta), delta.shape)
+    if delta[c, s] >= -1e-9:
+        return None
+    return int(c), int(s)
+
+def _move(p: np.ndarray, load: np.ndarray, capacity: np.ndarray, action: Action):
+    c, s = action
+    if p[c] != s and load[s] < capacity[s]:
+        load[p[c]] -= 1
+        load[s] += 1
+        p[c] = s
+
+def score_rollouts(placement: np.ndarray, capacity: np.ndarray, D: np.ndarray, forecasts: List[np.ndarray],
+                   actions: List[Action], deadline: float) -> List[float]:
+    scores = []
+    for i, action in enumerate(actions):
+        if i > 0 and time.time() > deadline:
+            scores.append(np.inf)
+            continue
+        p = placement.copy()
+        load = np.bincount(p, minlength=len(capacity))
+        _move(p, load, capacity, action)
+        total = 0.0
+        for k, W in enumerate(forecasts):
+            if k > 0:
+                 
+                follow = _best_move(W, D, p, load, capacity)
+                if follow is not None:
+                    _move(p, load, capacity, follow)
+            total += _placement_cost(W, D, p)
+        scores.append(total)
+    return scores
+
+class LookaheadSearch:
+    def __init__(self, env, agent=None, risk: float = 1.0, workers: int = 0, seed: Optional[int] = None):
+        self.env = env
+        self.agent = agent
+        self.risk = risk
+        self.workers = workers
+        self.rng = np.random.default_rng(seed)
+        self.last_report: Dict = {}
+
+    def forecasts(self, depth: int) -> List[np.ndarray]:
+        env = self.env
+        pred, q = env.predictor.predict(env.current_traffic, step=env.current_step)
+        out = [planning_weights(env.traffic_gen.get_traffic_array(), pred, q, self.risk)]
+        if depth <= 1:
+            return out
+
+         
+        predictor = env.predictor
+        gen = copy.deepcopy(env.traffic_gen)
+        gen.rng = np.random.default_rng(self.rng.integers(2**63))
+        future = copy.deepcopy(predictor, {id(predictor.model): predictor.model,
+                                           id(predictor.optimizer): predictor.optimizer,
+                                           id(predictor.compiled): predictor.compiled})
+        for k in range(1, depth):
+            gen.generate_temporal_traffic(env.current_step + k)
+            pred, q = future.predict(gen.get_traffic())
+            out.append(planning_weights(gen.get_traffic_array(), pred, q, self.risk))
+        return out
+
+    def candidates(self, W: np.ndarray, width: int) -> List[Action]:
+        env = self.env
+        topo = env.topology
+        seen = set()
+        out: List[Action] = []
+
+        def add(action):
+            key = (int(action[0]), int(action[1]))
+            if key not in seen:
+                seen.add(key)
+                out.append(key)
+
+        add(env.noop_action())
+        model = self.agent.model if self.agent is not None else None
+        if model is not None:
+            obs = env._get_obs()
+            add(model.predict(obs, deterministic=True)[0])
+            samples, _ = model.predict(np.repeat(obs[None, :], max(1, width // 2), axis=0), deterministic=False)
+            for action in samples:
+                add(action)
+        full = topo.occupancy >= topo.server_capacity
+        D = topo.distance_matrix.astype(np.float64)
+        _, delta = placement_move_deltas(D, topo.placement, W, blocked=full)
+        order = np.argsort(delta, axis=None, kind="stable")
+        reserve = max(1, width // 4)
+        for flat in order[:width]:
+            c, s = np.unravel_index(flat, delta.shape)
+            if not np.isfinite(delta[c, s]) or len(out) > width - reserve:
+                break
+            add((c, s))
+         
+         
+        if env.cost_engine.traffic is not None:
+            for c in np.argsort(-W.sum(axis=1), kind="stable")[:reserve]:
+                what_if = env.cost_engine.move_deltas(int(c))
+                what_if[full] = np.inf
+                s = int(np.argmin(what_if))
+                if what_if[s] < -1e-9:
+                    add((c, s))
+        return out[:width + 1]
+
+    def _score_parallel(self, args, actions: List[Action], deadline: float, workers: int) -> List[float]:
+        chunks = [actions[i::workers] for i in range(workers)]
+        futures = [_executor(self.workers).submit(score_rollouts, *args, chunk, deadline) for chunk in chunks]
+        scores = [np.inf] * len(actions)
+        for i, future in enumerate(futures):
+            for j, score in enumerate(future.result()):
+                scores[i + j * workers] = score
+        return scores
+
+    def decide(self, width: int = 8, depth: int = 1, time_budget: float = 0.05) -> np.ndarray:
+        start = time.time()
+        deadline = start + time_budget
+        topo = self.env.topology
+        forecasts = self.forecasts(max(1, depth))
+        actions = self.candidates(forecasts[0], max(1, width))
+        args = (topo.placement.copy(), topo.server_capacity, topo.distance_matrix.astype(np.float64), forecasts)
+        workers = min(self.workers, len(actions))
+        scores = None
+        if workers > 1 and not mp.current_process().daemon:
+            try:
+                scores = self._score_parallel(args, actions, deadline, workers)
+            except BrokenProcessPool as e:
+                 
+                logger.warning("Look-ahead worker pool broke, scoring in-process: %s", e)
+                executor = _executors.pop(self.workers, None)
+                if executor is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+        if scores is None:
+            scores = score_rollouts(*args, actions, deadline)
+        best = int(np.argmin(scores))
+        self.last_report = {
+            "candidates": len(actions),
+            "evaluated": int(np.isfinite(scores).sum()),
+            "best_score": float(scores[best]),
+            "baseline_score": float(scores[0]),
+            "seconds": time.time() - start,
+        }
+        return np.array(actions[best], dtype=np.int64)
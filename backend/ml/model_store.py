@@ -0,0 +1,90 @@
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import time
+import numpy as np
+import torch
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+@contextlib.contextmanager
+def atomic_write(path: str, mode: str = "wb"):
+     
+     
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+class ModelStore:
+    def __init__(self, root: str = "model_store"):
+        self.root = root
+
+    @staticmethod
+    def key_for(num_pods: int, servers_per_pod: int, num_containers: int, history_len: int, seed: Optional[int],
+                topology_kind: str = "tree", traffic_fingerprint: Optional[str] = None) -> str:
+        seed_part = "none" if seed is None else str(seed)
+        key = f"p{num_pods}_s{servers_per_pod}_c{num_containers}_h{history_len}_seed{seed_part}"
+        if traffic_fingerprint is not None:
+             
+            key = f"{key}_g{traffic_fingerprint}"
+        return key if topology_kind == "tree" else f"{topology_kind}_{key}"
+
+    def _dir(self, key: str) -> str:
+        path = os.path.join(self.root, key)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def predictor_path(self, key: str) -> str:
+        return os.path.join(self._dir(key), "predictor.pt")
+
+    def policy_path(self, key: str) -> str:
+         
+        return os.path.join(self._dir(key), "ppo_policy")
+
+    def compiled_path(self, key: str, name: str) -> str:
+        return os.path.join(self._dir(key), f"{name}.ts")
+
+    def has_policy(self, key: str) -> bool:
+        return os.path.exists(f"{self.policy_path(key)}.zip")
+
+    def load_meta(self, key: str) -> Dict[str, Any]:
+        path = os.path.join(self._dir(key), "meta.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def record(self, key: str, **fields):
+        meta = self.load_meta(key)
+        meta.update(fields)
+        meta["updated_at"] = time.time()
+        with atomic_write(os.path.join(self._dir(key), "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    def save_predictor(self, key: str, predictor):
+        state = predictor.get_state()
+        with atomic_write(self.predictor_path(key)) as f:
+            torch.save({
+                "model": state["model"],
+                "uncertainty_q": torch.from_numpy(np.asarray(state["uncertainty_q"], dtype=np.float32)),
+            }, f)
+        self.record(key, predictor_train_seconds=predictor.train_seconds)
+
+    def load_predictor(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self.predictor_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            data = torch.load(path, map_location="cpu")
+        except Exception as e:
+            logger.warning("Ignoring unreadable predictor checkpoint %s: %s", path, e)
+            return None
+        return {"model": data["model"], "uncertainty_q": data["uncertainty_q"].numpy()}
@@ -0,0 +1,134 @@
+import time
+import numpy as np
+from scipy import sparse
+from typing import List
+from simulation.cost import placement_move_deltas
+
+def planning_weights(T: np.ndarray, pred: np.ndarray, uncertainty=None, risk: float = 0.0) -> np.ndarray:
+    T = T.toarray().astype(np.float64) if sparse.issparse(T) else np.asarray(T, dtype=np.float64)
+    expected = np.asarray(pred, dtype=np.float64)
+    if uncertainty is not None and risk:
+        expected = expected + risk * np.asarray(uncertainty, dtype=np.float64)
+    current_in = T.sum(axis=0) / 1000.0
+    growth = np.clip(expected / np.maximum(current_in, 1e-6), 0.0, 10.0)
+    W = T * growth[None, :]
+    return W + W.T
+
+class PlacementOptimizer:
+    methods = ("greedy", "local_search", "partition")
+
+    def __init__(self, env):
+        self.env = env
+
+    def _planning_weights(self) -> np.ndarray:
+        env = self.env
+        pred, _ = env.predictor.predict(env.current_traffic, step=env.current_step)
+        return planning_weights(env.traffic_gen.get_traffic_array(), pred)
+
+    def _capacity(self) -> np.ndarray:
+        return self.env.topology.server_capacity.astype(np.int64)
+
+    def plan(self, method: str = "local_search", time_budget: float = 0.5) -> np.ndarray:
+        if method not in self.methods:
+            raise ValueError(f"Unknown placement method '{method}', expected one of {self.methods}")
+        deadline = time.perf_counter() + time_budget
+        A = self._planning_weights()
+        D = self.env.topology.distance_matrix.astype(np.float64)
+        capacity = self._capacity()
+
+        if method == "greedy":
+            placement = self._greedy(A, D, capacity)
+        elif method == "partition":
+            placement = self._partition(A, capacity)
+        else:
+            placement = self.env.topology.placement.copy()
+            if np.any(np.bincount(placement, minlength=len(capacity)) > capacity):
+                placement = self._greedy(A, D, capacity)
+         
+        return self._local_search(A, D, capacity, placement, deadline)
+
+    def _greedy(self, A: np.ndarray, D: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+        n = A.shape[0]
+        current = self.env.topology.placement
+        placement = np.full(n, -1, dtype=np.int64)
+        load = np.zeros(len(capacity), dtype=np.int64)
+        placed: List[int] = []
+        for c in np.argsort(-A.sum(axis=1), kind="stable"):
+            if placed:
+                cost_at = D[:, placement[placed]] @ A[c, placed]
+            else:
+                cost_at = np.zeros(len(capacity))
+            cost_at = cost_at - 1e-9 * (np.arange(len(capacity)) == current[c])
+            cost_at[load >= capacity] = np.inf
+            server = int(np.argmin(cost_at))
+            placement[c] = server
+            load[server] += 1
+            placed.append(c)
+        return placement
+
+    def _grow_parts(self, A: np.ndarray, members: np.ndarray, part_capacity: List[int]) -> List[np.ndarray]:
+        remaining = list(members)
+        parts = []
+        for cap in part_capacity:
+            if not remaining:
+                parts.append(np.array([], dtype=np.int64))
+                continue
+            rem = np.array(remaining)
+            seed = rem[np.argmax(A[np.ix_(rem, rem)].sum(axis=1))]
+            part = [seed]
+            remaining.remove(seed)
+            affinity = A[seed, :].copy()
+            while len(part) < cap and remaining:
+                rem = np.array(remaining)
+                nxt = int(rem[np.argmax(affinity[rem])])
+                part.append(nxt)
+                remaining.remove(nxt)
+                affinity += A[nxt, :]
+            parts.append(np.array(part, dtype=np.int64))
+        return parts
+
+    def _partition(self, A: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+        topo = self.env.topology
+        n = A.shape[0]
+        placement = np.zeros(n, dtype=np.int64)
+        pods = [np.flatnonzero(topo.server_pod == pod) for pod in range(topo.num_pods)]
+        pod_caps = [int(capacity[servers].sum()) for servers in pods]
+        pod_parts = self._grow_parts(A, np.arange(n), pod_caps)
+        for servers, members in zip(pods, pod_parts):
+            server_parts = self._grow_parts(A, members, [int(capacity[s]) for s in servers])
+            for server, part in zip(servers, server_parts):
+                placement[part] = server
+        return placement
+
+    def _local_search(self, A: np.ndarray, D: np.ndarray, capacity: np.ndarray,
+                      placement: np.ndarray, deadline: float) -> np.ndarray:
+        p = placement.copy()
+        n = A.shape[0]
+        load = np.bincount(p, minlength=len(capacity))
+        while time.perf_counter() < deadline:
+            improved = False
+            cost_at, delta = placement_move_deltas(D, p, A, blocked=load >= capacity)
+            c, s = np.unravel_index(np.argmin(delta), delta.shape)
+            if delta[c, s] < -1e-9:
+                load[p[c]] -= 1
+                load[s] += 1
+                p[c] = s
+                improved = True
+            else:
+                own = cost_at[np.arange(n), p]
+                swap = cost_at[:, p] - own[:, None]
+                swap = swap + swap.T + 2 * A * D[p[:, None], p[None, :]]
+                np.fill_diagonal(swap, np.inf)
+                a, b = np.unravel_index(np.argmin(swap), swap.shape)
+                if swap[a, b] < -1e-9:
+                    p[a], p[b] = p[b], p[a]
+                    improved = True
+            if not improved:
+                break
+        return p
+
+    def apply(self, placement: np.ndarray) -> int:
+        moves = int(np.count_nonzero(self.env.topology.placement != placement))
+        if not self.env.cost_engine.apply_placement(placement):
+            return 0
+        return moves
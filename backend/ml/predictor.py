@@ -2,7 +2,34 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 import numpy as np
-from simulation.traffic import TrafficGenerator
+import copy
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence
+from simulation.traffic import TrafficGenerator, TrafficMatrixView
+from ml.inference import export_module, input_buffer, timed_call
+from ml.model_store import atomic_write
+
+logger = logging.getLogger(__name__)
+
+DATASET_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dataset_cache")
+
+def _generate_episode(traffic_gen: TrafficGenerator, seed: int, steps_per_ep: int, history_len: int):
+     
+     
+    traffic_gen.reset()
+    traffic_gen.seed(seed)
+    vecs = np.empty((steps_per_ep + 1, traffic_gen.num_containers), dtype=np.float32)
+    for step in range(steps_per_ep + 1):
+        traffic_gen.generate_temporal_traffic(step)
+        vecs[step] = traffic_gen.get_traffic().column_sums() / 1000.0
+    starts = np.arange(history_len, steps_per_ep)
+    windows = np.arange(-history_len + 1, 1)
+    X = vecs[starts[:, None] + windows[None, :]]
+    y = vecs[starts + 1]
+    return X, y
 
 class TrafficLSTM(nn.Module):
     def __init__(self, input_size, hidden_size, output_size):
@@ -27,50 +54,92 @@ class TrafficPredictor:
         self.model = TrafficLSTM(self.input_size, self.hidden_size, self.input_size)
         self.optimizer = optim.Adam(self.model.parameters(), lr=0.01)
         self.criterion = nn.MSELoss()
-        self.history_buffer = []
+        self.history = torch.zeros(history_len, num_containers)
+        self._head = 0
+        self._filled = 0
+        self._order = torch.arange(history_len)
+        self._window = input_buffer((1, history_len, num_containers))
+        self.compiled: Optional[torch.jit.ScriptModule] = None
+        self._memo_step = None
+        self._memo = None
+        self._batch_window: Optional[torch.Tensor] = None
+        self.train_seconds = 0.0
 
-    def prepare_data(self, traffic_gen: TrafficGenerator, episodes=50, steps_per_ep=100):
-        X, y = [], []
-        
-        for _ in range(episodes):
-            history = np.zeros((self.history_len, self.input_size))
-            for step in range(steps_per_ep):  
-                traffic_map = traffic_gen.peek_traffic(step)
-                
-                 
-                current_vec = self._map_to_vector(traffic_map)
-                
-                 
-                next_traffic_map = traffic_gen.peek_traffic(step + 1)
-                next_vec = self._map_to_vector(next_traffic_map)
-                history = np.roll(history, -1, axis=0)
-                history[-1] = current_vec
-                
-                if step >= self.history_len:
-                    X.append(history.copy())
-                    y.append(next_vec.copy())
-                    
-        return np.array(X, dtype=np.float32), np.array(y, dtype=np.float32)
-
-    def train(self, traffic_gen: TrafficGenerator):
+    def prepare_data(self, traffic_gen: TrafficGenerator, episodes=50, steps_per_ep=100,
+                     workers: Optional[int] = None, cache_dir: Optional[str] = DATASET_CACHE_DIR):
+        seeds = [int(s) for s in traffic_gen.rng.integers(0, 2**31 - 1, size=episodes)]
+        cache_path = None
+        if cache_dir is not None and traffic_gen.base_seed is not None:
+            key = (f"c{self.num_containers}_h{self.history_len}_e{episodes}_s{steps_per_ep}"
+                   f"_seed{traffic_gen.base_seed}_g{traffic_gen.fingerprint()}")
+            cache_path = os.path.join(cache_dir, f"{key}.npz")
+            if os.path.exists(cache_path):
+                with np.load(cache_path) as data:
+                    return data["X"], data["y"]
+
+        template = copy.deepcopy(traffic_gen)
+        workers = workers or os.cpu_count() or 1
+        args = ([template] * episodes, seeds, [steps_per_ep] * episodes, [self.history_len] * episodes)
+        if workers > 1 and episodes > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, episodes)) as pool:
+                results = list(pool.map(_generate_episode, *args))
+        else:
+            results = [_generate_episode(copy.deepcopy(template), *a[1:]) for a in zip(*args)]
+
+        X = np.concatenate([r[0] for r in results]).astype(np.float32)
+        y = np.concatenate([r[1] for r in results]).astype(np.float32)
+        if cache_path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            with atomic_write(cache_path) as f:
+                np.savez(f, X=X, y=y)
+        return X, y
+
+    def train(self, traffic_gen: TrafficGenerator, batch_size=256, max_epochs=150, patience=10):
         print("Training Traffic Predictor with Conformal Prediction...")
+        start = time.time()
+        self.compiled = None
         X, y = self.prepare_data(traffic_gen, episodes=60)  
         
          
+         
         split_idx = int(0.8 * len(X))
-        X_train, X_cal = X[:split_idx], X[split_idx:]
-        y_train, y_cal = y[:split_idx], y[split_idx:]
+        val_idx = int(0.7 * len(X))
+        X_train, X_val, X_cal = X[:val_idx], X[val_idx:split_idx], X[split_idx:]
+        y_train, y_val, y_cal = y[:val_idx], y[val_idx:split_idx], y[split_idx:]
         
         X_tensor = torch.from_numpy(X_train)
         y_tensor = torch.from_numpy(y_train)
+        X_val_tensor = torch.from_numpy(X_val)
+        y_val_tensor = torch.from_numpy(y_val)
         
-        epochs = 150
-        for epoch in range(epochs):
-            self.optimizer.zero_grad()
-            outputs = self.model(X_tensor)
-            loss = self.criterion(outputs, y_tensor)
-            loss.backward()
-            self.optimizer.step()
+        best_loss = float("inf")
+        best_state = None
+        stale_epochs = 0
+        for epoch in range(max_epochs):
+            self.model.train()
+            order = torch.randperm(len(X_tensor))
+            for i in range(0, len(order), batch_size):
+                idx = order[i:i + batch_size]
+                self.optimizer.zero_grad()
+                outputs = self.model(X_tensor[idx])
+                loss = self.criterion(outputs, y_tensor[idx])
+                loss.backward()
+                self.optimizer.step()
+
+            self.model.eval()
+            with torch.inference_mode():
+                val_loss = self.criterion(self.model(X_val_tensor), y_val_tensor).item()
+            if val_loss < best_loss:
+                best_loss = val_loss
+                best_state = {k: v.detach().clone() for k, v in self.model.state_dict().items()}
+                stale_epochs = 0
+            else:
+                stale_epochs += 1
+                if stale_epochs >= patience:
+                    break
+        if best_state is not None:
+            self.model.load_state_dict(best_state)
+        print(f"Stopped after {epoch + 1} epochs (best val loss {best_loss:.4f})")
             
         print("Model Trained. Calibrating uncertainty") 
         self.model.eval()
@@ -81,35 +150,120 @@ class TrafficPredictor:
             self.uncertainty_q = np.percentile(residuals, 90, axis=0)
             
         print(f"Calibration Complete. Max Uncertainty: {np.max(self.uncertainty_q):.2f}")
-        self.model.train()
+        self.train_seconds = time.time() - start
+
+    def predict(self, current_traffic_map, step: Optional[int] = None):
+         
+         
+        if step is not None and step == self._memo_step:
+            return self._memo
+        vec = self._push(current_traffic_map)
+        return self._forecast(vec, step)
+
+    def predict_many(self, predictors: Sequence["TrafficPredictor"], traffic_maps: Sequence,
+                     steps: Sequence[Optional[int]]):
+         
+         
+        results = [None] * len(predictors)
+        ready = []
+        for i, (predictor, traffic_map, step) in enumerate(zip(predictors, traffic_maps, steps)):
+            if step is not None and step == predictor._memo_step:
+                results[i] = predictor._memo
+                continue
+            vec = predictor._push(traffic_map)
+            if predictor._filled < predictor.history_len:
+                results[i] = predictor._remember((vec, np.ones_like(vec) * 10.0), step)
+            else:
+                ready.append(i)
+        if ready:
+            if self._batch_window is None or self._batch_window.shape[0] != len(ready):
+                self._batch_window = input_buffer((len(ready), self.history_len, self.num_containers))
+            for row, i in enumerate(ready):
+                predictors[i]._gather_window(self._batch_window[row])
+            preds = self._forward(self._batch_window)
+            for row, i in enumerate(ready):
+                results[i] = predictors[i]._remember((preds[row], self.uncertainty_q), steps[i])
+        return results
 
-    def predict(self, current_traffic_map):
+    def revise(self, current_traffic_map, step: Optional[int] = None):
          
+         
+        if self._filled == 0:
+            return self.predict(current_traffic_map, step)
         vec = self._map_to_vector(current_traffic_map)
-        self.history_buffer.append(vec)
-        
-        if len(self.history_buffer) > self.history_len:
-            self.history_buffer.pop(0)
-            
+        self.history[(self._head - 1) % self.history_len] = torch.from_numpy(np.asarray(vec, dtype=np.float32))
+        self._memo_step = None
+        return self._forecast(vec, step)
+
+    def _push(self, current_traffic_map) -> np.ndarray:
+        vec = self._map_to_vector(current_traffic_map)
+        self.history[self._head] = torch.from_numpy(np.asarray(vec, dtype=np.float32))
+        self._head = (self._head + 1) % self.history_len
+        self._filled = min(self._filled + 1, self.history_len)
+        return vec
+
+    def _gather_window(self, out: torch.Tensor):
+        torch.index_select(self.history, 0, (self._order + self._head) % self.history_len, out=out)
+
+    def _remember(self, result, step: Optional[int]):
+        if step is not None:
+            self._memo_step = step
+            self._memo = result
+        return result
+
+    def _forecast(self, vec: np.ndarray, step: Optional[int]):
          
-        if len(self.history_buffer) < self.history_len:
-            return vec, np.ones_like(vec) * 10.0     
-        input_tensor = torch.tensor([self.history_buffer], dtype=torch.float32)
+        if self._filled < self.history_len:
+            result = (vec, np.ones_like(vec) * 10.0)
+        else:
+            self._gather_window(self._window[0])
+            pred = self._forward(self._window)[0]
+            result = (pred, self.uncertainty_q)
+        return self._remember(result, step)
+
+    def _forward(self, x: torch.Tensor) -> np.ndarray:
+        compiled = self.compiled
+        if compiled is not None:
+            try:
+                with torch.inference_mode():
+                    return timed_call("predictor", "torchscript", lambda: compiled(x).numpy())
+            except Exception as e:
+                logger.warning("Compiled predictor failed, falling back to eager: %s", e)
+                self.compiled = None
+        with torch.inference_mode():
+            return timed_call("predictor", "eager", lambda: self.model(x).numpy())
+
+    def compile(self, path: Optional[str] = None) -> bool:
+        try:
+            self.compiled = export_module(self.model, path)
+        except Exception as e:
+            logger.warning("Predictor export failed, using eager inference: %s", e)
+            self.compiled = None
+        return self.compiled is not None
+
+    def get_state(self):
+        return {
+            "model": {k: v.detach().clone() for k, v in self.model.state_dict().items()},
+            "uncertainty_q": np.array(self.uncertainty_q, copy=True),
+        }
+
+    def load_state(self, state):
+        self.model.load_state_dict(state["model"])
         self.model.eval()
-        with torch.no_grad():
-            pred = self.model(input_tensor).numpy()[0]
-        self.model.train()
-        
-         
-        return pred, self.uncertainty_q
+        self.compiled = None
+        self.uncertainty_q = np.array(state["uncertainty_q"], copy=True)
 
     def reset(self):
-        self.history_buffer = []
          
-        for _ in range(self.history_len):
-            self.history_buffer.append(np.zeros(self.num_containers))
+        self.history.zero_()
+        self._head = 0
+        self._filled = self.history_len
+        self._memo_step = None
+        self._memo = None
 
     def _map_to_vector(self, traffic_map):
+        if isinstance(traffic_map, TrafficMatrixView):
+            return traffic_map.column_sums() / 1000.0
         vec = np.zeros(self.num_containers)
         for src, dests in traffic_map.items():
             for dst, vol in dests.items():
@@ -0,0 +1,105 @@
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+from stable_baselines3.common.callbacks import BaseCallback
+from ml.agent import RLAgent
+from instrumentation import REGISTRY
+
+class TrainingJob:
+    def __init__(self, total_timesteps: int):
+        self.id = uuid.uuid4().hex
+        self.total_timesteps = total_timesteps
+        self.status = "pending"
+        self.timesteps_done = 0
+        self.mean_reward: Optional[float] = None
+        self.fps = 0.0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self.status in ("pending", "running")
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total_timesteps": self.total_timesteps,
+            "timesteps_done": self.timesteps_done,
+            "mean_reward": self.mean_reward,
+            "fps": self.fps,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+class TrainingProgressCallback(BaseCallback):
+    def __init__(self, job: TrainingJob):
+        super().__init__()
+        self.job = job
+        self._phase_start = None
+        self._last_timesteps = 0
+
+    def _on_rollout_start(self):
+        now = time.perf_counter()
+        if self._phase_start is not None:
+            REGISTRY.observe("ppo_phase_seconds", now - self._phase_start, phase="update")
+        self._phase_start = now
+
+    def _on_step(self) -> bool:
+        self.job.timesteps_done = int(self.num_timesteps)
+        elapsed = time.time() - self.job.started_at
+        if elapsed > 0:
+            self.job.fps = self.num_timesteps / elapsed
+        return True
+
+    def _on_rollout_end(self):
+         
+         
+        rewards = self.model.rollout_buffer.rewards
+        self.job.mean_reward = float(rewards.mean())
+        now = time.perf_counter()
+        REGISTRY.observe("ppo_phase_seconds", now - self._phase_start, phase="rollout")
+        REGISTRY.inc("ppo_timesteps_total", self.num_timesteps - self._last_timesteps)
+        self._last_timesteps = self.num_timesteps
+        self._phase_start = now
+
+    def _on_training_end(self):
+        if self._phase_start is not None:
+            REGISTRY.observe("ppo_phase_seconds", time.perf_counter() - self._phase_start, phase="update")
+            self._phase_start = None
+
+class TrainingManager:
+    def __init__(self, agent: RLAgent):
+        self.agent = agent
+        self.jobs: Dict[str, TrainingJob] = {}
+        self.current: Optional[TrainingJob] = None
+        self._lock = threading.Lock()
+
+    def start(self, total_timesteps: int = 20000) -> TrainingJob:
+        with self._lock:
+            if self.current is not None and self.current.running:
+                return self.current
+            job = TrainingJob(total_timesteps)
+            self.jobs[job.id] = job
+            self.current = job
+        thread = threading.Thread(target=self._run, args=(job,), name=f"train-{job.id[:8]}", daemon=True)
+        thread.start()
+        return job
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self.jobs.get(job_id)
+
+    def _run(self, job: TrainingJob):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            self.agent.train(total_timesteps=job.total_timesteps, callback=TrainingProgressCallback(job))
+            job.status = "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
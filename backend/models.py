@@ -9,6 +9,7 @@ class TopologyState(BaseModel):
     active_servers: List[str] = []
     active_chains: List[str] = []
     step: int = 0
+    network_cost: float = 0.0
 
 class OptimizationResult(BaseModel):
     initial_cost: float
@@ -0,0 +1,149 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, NamedTuple, Optional
+from models import TopologyState
+
+logger = logging.getLogger(__name__)
+
+class RunnerStopped(RuntimeError):
+    pass
+
+class Snapshot(NamedTuple):
+    state: Dict[str, Any]
+    body: bytes
+    step: int
+
+class SimulationRunner:
+    def __init__(self, env, streamer=None):
+        self.env = env
+        self.streamer = streamer
+        self._commands: "queue.Queue" = queue.Queue()
+        self._stopping = False
+        self._lock = threading.Lock()
+        self.snapshot: Snapshot = self.publish()
+        self._thread = threading.Thread(target=self._run, name="simulation-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, command: Callable[[Any], Any]) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._stopping:
+                raise RunnerStopped("Simulation runner has stopped")
+            self._commands.put((command, future))
+        return future
+
+    def call(self, command: Callable[[Any], Any], timeout: Optional[float] = None):
+        return self.submit(command).result(timeout)
+
+    def _run(self):
+        while True:
+            command, future = self._commands.get()
+            if command is None:
+                self._fail_pending()
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(command(self.env))
+            except BaseException as exc:
+                future.set_exception(exc)
+
+    def publish(self) -> Snapshot:
+        state = self.env.get_current_state()
+        state["containers"] = dict(state["containers"])
+        body = TopologyState(**state).model_dump_json().encode()
+        snapshot = Snapshot(state, body, self.env.current_step)
+        self.snapshot = snapshot
+        if self.streamer is not None:
+            self.streamer.publish(self.env, state)
+        return snapshot
+
+    def _fail_pending(self):
+        while True:
+            try:
+                _, future = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            if future is not None and future.set_running_or_notify_cancel():
+                future.set_exception(RunnerStopped("Simulation runner has stopped"))
+
+    def stop(self):
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._commands.put((None, None))
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+class AutoPlayer:
+    max_tick_rate = 1000.0
+
+    def __init__(self, tick: Callable[[], Any], tick_rate: float = 5.0, steps_per_tick: int = 1):
+        self.tick = tick
+        self.tick_rate = tick_rate
+        self.steps_per_tick = steps_per_tick
+        self.running = False
+        self.ticks = 0
+        self.late_ticks = 0
+        self.throttled_ticks = 0
+        self.last_error: Optional[str] = None
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def set_speed(self, tick_rate: float):
+        if not 0 < tick_rate <= self.max_tick_rate:
+            raise ValueError(f"tick_rate must be in (0, {self.max_tick_rate}]")
+        self.tick_rate = tick_rate
+        self._wake.set()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._wake.clear()
+        self._thread = threading.Thread(target=self._run, name="autoplay", daemon=True)
+        self._thread.start()
+
+    def pause(self):
+        self.running = False
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        next_tick = time.perf_counter()
+        while self.running:
+            try:
+                if self.tick() is False:
+                    self.throttled_ticks += 1
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning("Autoplay tick failed: %s", e)
+            self.ticks += 1
+            next_tick += 1.0 / self.tick_rate
+            now = time.perf_counter()
+            if now > next_tick:
+                 
+                self.late_ticks += 1
+                next_tick = now
+                continue
+            if self._wake.wait(next_tick - now):
+                self._wake.clear()
+                next_tick = time.perf_counter()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "tick_rate": self.tick_rate,
+            "steps_per_tick": self.steps_per_tick,
+            "ticks": self.ticks,
+            "late_ticks": self.late_ticks,
+            "throttled_ticks": self.throttled_ticks,
+            "last_error": self.last_error,
+        }
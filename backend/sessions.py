@@ -0,0 +1,408 @@
+import copy
+import multiprocessing as mp
+import os
+import threading
+import time
+import tracemalloc
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import torch
+from scipy import sparse
+from ml.agent import RLAgent
+from ml.environment import DataCenterEnv
+from ml.lookahead import LookaheadSearch
+from ml.placement import PlacementOptimizer
+from runner import SimulationRunner
+from streaming import StateStreamer
+
+class TickBudgetExceeded(RuntimeError):
+    pass
+
+class SessionNotFound(LookupError):
+    pass
+
+class TickBudget:
+    def __init__(self, rate: Optional[float], burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._stamp = time.monotonic()
+
+    def take(self, ticks: int):
+        if ticks < 0:
+            raise ValueError(f"Tick count must be non-negative, got {ticks}")
+        if self.rate is None:
+            return
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        if ticks > self.tokens:
+            raise TickBudgetExceeded(f"Tick budget exhausted: {ticks} requested, {int(self.tokens)} available")
+        self.tokens -= ticks
+
+def reset(session):
+    session.env.reset()
+    return {"message": "Simulation reset", "state": session.runner.publish().state}
+
+def optimize(session, steps: int = 10, optimizer: str = "ppo", time_budget_ms: int = 500,
+             width: int = 8, depth: int = 1):
+    env, runner, agent = session.env, session.runner, session.agent
+    initial_cost = env._calculate_network_cost()
+    moves = None
+    search_reports = []
+
+    if optimizer in PlacementOptimizer.methods:
+        placement = session.placer.plan(optimizer, time_budget=time_budget_ms / 1000.0)
+        moves = session.placer.apply(placement)
+        runner.publish()
+
+    snapshot = runner.snapshot
+    obs = env._get_obs()
+    last_info = {}
+
+    for _ in range(steps):
+        if optimizer == "lookahead":
+            action = session.search.decide(width, depth, time_budget=time_budget_ms / 1000.0 / max(1, steps))
+            search_reports.append(session.search.last_report)
+        else:
+            action = agent.predict(obs) if optimizer == "ppo" else env.noop_action()
+        obs, reward, terminated, truncated, last_info = env.step(action)
+        snapshot = runner.publish()
+
+    final_cost = env._calculate_network_cost()
+
+    if "active_servers" not in last_info:
+        active_servers = list(env.topology.active_servers)
+        last_info["active_servers"] = active_servers
+        last_info["energy_cost"] = len(active_servers) * 100.0
+
+    metrics = {
+        "step": env.current_step,
+        "reward": float(last_info.get("reward", 0)),
+        "network_cost": float(last_info.get("network_cost", 0)),
+        "energy_cost": float(last_info.get("energy_cost", 0)),
+        "active_servers": last_info.get("active_servers", 0),
+        "active_chains": last_info.get("active_chains", [])
+    }
+    return {
+        "initial_cost": initial_cost,
+        "final_cost": final_cost,
+        "steps_taken": steps,
+        "final_state": snapshot.state,
+        "metrics": metrics,
+        "policy": optimizer if optimizer != "ppo" else ("ppo" if agent.model else "random"),
+        "moves": moves,
+        "lookahead": search_reports or None,
+    }
+
+def burst(session):
+    new_cost = session.env.trigger_burst()
+    return {
+        "message": "Traffic burst triggered!",
+        "new_cost": new_cost,
+        "state": session.runner.publish().state
+    }
+
+def force_chain(session, chain: Optional[str] = None):
+    env = session.env
+    chains = env.traffic_gen.chains
+    if not len(chains):
+        raise ValueError("No service chains are configured")
+    index = 0 if chain is None else chains.index(chain)
+
+    chains.start([index])
+
+    obs = env._get_obs()
+    action = session.agent.predict(obs)
+    env.step(action)
+    return {"message": f"{chains.names[index]} FORCE STARTED", "state": session.runner.publish().state}
+
+def tick(session, steps: int = 1):
+    env, agent = session.env, session.agent
+    obs = env._get_obs()
+    for _ in range(steps):
+        obs, reward, terminated, truncated, info = env.step(agent.predict(obs))
+    return session.runner.publish().step
+
+COMMANDS = {"reset": reset, "optimize": optimize, "burst": burst, "force_chain": force_chain, "tick": tick}
+
+def command_ticks(name: str, kwargs: Dict[str, Any]) -> int:
+    if name in ("optimize", "tick"):
+        return int(kwargs.get("steps", 10 if name == "optimize" else 1))
+    return 1 if name == "force_chain" else 0
+
+def _nbytes(value) -> int:
+    if isinstance(value, np.memmap):
+        return 0
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if sparse.issparse(value):
+        value = value.tocsr()
+        return value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    if isinstance(value, torch.Tensor):
+        return value.element_size() * value.nelement()
+    return 0
+
+class Session:
+    def __init__(self, session_id: str, env: DataCenterEnv, agent: RLAgent, streamer=None,
+                 tick_rate: Optional[float] = None, tick_burst: float = 0.0, shared_ids=frozenset(),
+                 lookahead_workers: int = 0, overhead_bytes: int = 0):
+        self.id = session_id
+        self.env = env
+        self.agent = agent
+        self.placer = PlacementOptimizer(env)
+        self.search = LookaheadSearch(env, agent, workers=lookahead_workers, seed=env.seed)
+        self.budget = TickBudget(tick_rate, tick_burst)
+        self.runner = SimulationRunner(env, streamer)
+        self.last_used = time.monotonic()
+        parts = (env, env.topology, env.traffic_gen, env.cost_engine, env.predictor)
+        self.nbytes = sum(_nbytes(v) for part in parts for v in vars(part).values() if id(v) not in shared_ids)
+        self.nbytes += len(self.runner.snapshot.body) + overhead_bytes
+
+    def run(self, name: str, **kwargs):
+        if name not in COMMANDS:
+            raise ValueError(f"Unknown command '{name}', expected one of {tuple(COMMANDS)}")
+        self.last_used = time.monotonic()
+
+        def command(env):
+            self.budget.take(command_ticks(name, kwargs))
+            return COMMANDS[name](self, **kwargs)
+        return self.runner.call(command)
+
+    def close(self):
+        self.runner.stop()
+        if self.runner.streamer is not None:
+            self.runner.streamer.close()
+
+class SharedAssets:
+    def __init__(self, env: DataCenterEnv, agent: RLAgent):
+        topo = env.topology
+        self.agent = agent
+        self.shared = [env.predictor.model, env.predictor.optimizer, env.predictor.uncertainty_q, env.predictor.compiled,
+                       topo.distance_matrix, topo.server_pod, topo.server_rack, topo.server_capacity,
+                       topo._nodes, topo._links, getattr(topo, "_link_level", None),
+                       getattr(topo, "_link_group", None), getattr(topo, "_link_divisor", None)]
+        for obj in self.shared:
+            if isinstance(obj, np.ndarray):
+                obj.flags.writeable = False
+        self.shared_ids = frozenset(id(obj) for obj in self.shared if obj is not None)
+        self.template = copy.deepcopy(env, self._memo())
+        self._policy_mtime = self._policy_stamp()
+        self.session_overhead = self._measure_overhead()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], predictor_state, policy_path: str, compiled: bool = False):
+        env = DataCenterEnv(predictor_state=predictor_state, **config)
+        if compiled:
+            env.predictor.compile()
+        agent = RLAgent(env, model_path=policy_path, compile_policy=compiled)
+        agent.load()
+        return cls(env, agent)
+
+    def _measure_overhead(self) -> int:
+         
+         
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        probe = Session("probe", self.new_env(), self.agent, shared_ids=self.shared_ids)
+        traced = tracemalloc.get_traced_memory()[0] - before
+        if not tracing:
+            tracemalloc.stop()
+        probe.close()
+        return max(0, traced - probe.nbytes)
+
+    def _memo(self) -> Dict[int, Any]:
+        return {id(obj): obj for obj in self.shared if obj is not None}
+
+    def _policy_stamp(self) -> float:
+        path = f"{self.agent.model_path}.zip"
+        return os.path.getmtime(path) if os.path.exists(path) else 0.0
+
+    def refresh_policy(self):
+        stamp = self._policy_stamp()
+        if stamp > self._policy_mtime:
+            self._policy_mtime = stamp
+            self.agent.load()
+
+    def new_env(self, seed: Optional[int] = None) -> DataCenterEnv:
+        env = copy.deepcopy(self.template, self._memo())
+        env.reset(seed=seed)
+        return env
+
+class SessionPool:
+    def __init__(self, assets: SharedAssets, max_bytes: int = 512 * 2**20,
+                 tick_rate: Optional[float] = 50.0, tick_burst: float = 500.0, lookahead_workers: int = 0,
+                 max_sessions: int = 256, on_evict: Optional[Callable[[str], None]] = None):
+        self.assets = assets
+        self.max_bytes = max_bytes
+        self.max_sessions = max(1, max_sessions)
+        self.tick_rate = tick_rate
+        self.tick_burst = tick_burst
+        self.lookahead_workers = lookahead_workers
+        self.on_evict = on_evict
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.evicted: List[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(s.nbytes for s in self.sessions.values())
+
+    def get(self, session_id: str, create: bool = True) -> Optional[Session]:
+        evicted = []
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                self.sessions.move_to_end(session_id)
+                return session
+            if not create:
+                return None
+            session = Session(session_id, self.assets.new_env(), self.assets.agent, streamer=StateStreamer(),
+                              tick_rate=self.tick_rate, tick_burst=self.tick_burst,
+                              shared_ids=self.assets.shared_ids, lookahead_workers=self.lookahead_workers,
+                              overhead_bytes=self.assets.session_overhead)
+            self.sessions[session_id] = session
+            while len(self.sessions) > 1 and (len(self.sessions) > self.max_sessions
+                                              or self.total_bytes > self.max_bytes):
+                evicted.append(self.sessions.popitem(last=False))
+            if self.on_evict is None:
+                self.evicted.extend(old_id for old_id, _ in evicted)
+         
+        for old_id, old in evicted:
+            old.close()
+            if self.on_evict is not None:
+                self.on_evict(old_id)
+        return session
+
+    def call(self, session_id: str, name: str, create: bool = True, **kwargs):
+        session = self.get(session_id, create)
+        if session is None:
+            raise SessionNotFound(session_id)
+        return session.run(name, **kwargs)
+
+    def snapshot_body(self, session_id: str) -> Optional[bytes]:
+        session = self.sessions.get(session_id)
+        return session.runner.snapshot.body if session is not None else None
+
+    def drop(self, session_id: str) -> bool:
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def close(self):
+        with self._lock:
+            sessions, self.sessions = list(self.sessions.values()), OrderedDict()
+        for session in sessions:
+            session.close()
+
+    def take_evicted(self) -> List[str]:
+        with self._lock:
+            evicted, self.evicted = self.evicted, []
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            sessions = [{"id": s.id, "bytes": s.nbytes, "step": s.runner.snapshot.step,
+                         "idle_seconds": now - s.last_used, "ticks_available": s.budget.tokens}
+                        for s in self.sessions.values()]
+        return {"sessions": sessions, "bytes": sum(s["bytes"] for s in sessions), "max_bytes": self.max_bytes,
+                "max_sessions": self.max_sessions}
+
+def _worker_main(conn, config, predictor_state, policy_path, compiled, pool_kwargs):
+    torch.set_num_threads(1)
+    assets = SharedAssets.from_config(config, predictor_state, policy_path, compiled)
+    pool = SessionPool(assets, **pool_kwargs)
+    while True:
+        try:
+            op, session_id, name, kwargs = conn.recv()
+        except EOFError:
+            return
+        if op == "stop":
+            return
+        try:
+            if op == "call":
+                assets.refresh_policy()
+                result = pool.call(session_id, name, **kwargs)
+                reply = ("ok", result, pool.snapshot_body(session_id), pool.take_evicted())
+            elif op == "drop":
+                reply = ("ok", pool.drop(session_id), None, [])
+            else:
+                reply = ("ok", pool.stats(), None, [])
+        except Exception as exc:
+            reply = ("error", exc, None, [])
+        conn.send(reply)
+
+class ProcessSessionPool:
+    def __init__(self, workers: int, config: Dict[str, Any], predictor_state, policy_path: str,
+                 start_method: Optional[str] = None, compiled: bool = False,
+                 on_evict: Optional[Callable[[str], None]] = None, **pool_kwargs):
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+        if "max_bytes" in pool_kwargs:
+            pool_kwargs["max_bytes"] //= workers
+        if "max_sessions" in pool_kwargs:
+            pool_kwargs["max_sessions"] = -(-pool_kwargs["max_sessions"] // workers)
+        self.workers = []
+        for _ in range(workers):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_worker_main,
+                               args=(child, config, predictor_state, policy_path, compiled, pool_kwargs), daemon=True)
+            proc.start()
+            child.close()
+            self.workers.append((parent, threading.Lock(), proc))
+        self.bodies: Dict[str, bytes] = {}
+        self.on_evict = on_evict
+
+    def _worker(self, session_id: str):
+        return self.workers[zlib.crc32(session_id.encode()) % len(self.workers)]
+
+    def _request(self, worker, op: str, session_id: Optional[str] = None, name: Optional[str] = None,
+                 kwargs: Optional[Dict[str, Any]] = None):
+        conn, lock, _ = worker
+        with lock:
+            conn.send((op, session_id, name, kwargs or {}))
+            status, value, body, evicted = conn.recv()
+        for old_id in evicted:
+            self.bodies.pop(old_id, None)
+            if self.on_evict is not None:
+                self.on_evict(old_id)
+        if status == "error":
+            raise value
+        if body is not None:
+            self.bodies[session_id] = body
+        return value
+
+    def call(self, session_id: str, name: str, create: bool = True, **kwargs):
+        return self._request(self._worker(session_id), "call", session_id, name, dict(kwargs, create=create))
+
+    def snapshot_body(self, session_id: str) -> Optional[bytes]:
+        return self.bodies.get(session_id)
+
+    def drop(self, session_id: str) -> bool:
+        self.bodies.pop(session_id, None)
+        return self._request(self._worker(session_id), "drop", session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        parts = [self._request(worker, "stats") for worker in self.workers]
+        return {
+            "sessions": [s for part in parts for s in part["sessions"]],
+            "bytes": sum(part["bytes"] for part in parts),
+            "max_bytes": sum(part["max_bytes"] for part in parts),
+            "max_sessions": sum(part["max_sessions"] for part in parts),
+            "workers": len(self.workers),
+        }
+
+    def close(self):
+        for conn, lock, proc in self.workers:
+            with lock:
+                conn.send(("stop", None, None, None))
+            proc.join(timeout=5)
@@ -0,0 +1,96 @@
+import json
+import os
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_CHAINS_PATH = os.path.join(os.path.dirname(__file__), "chains.json")
+
+class ChainEngine:
+    def __init__(self, definitions: List[Dict[str, Any]], container_index: Dict[str, int]):
+        self.names = [d["name"] for d in definitions]
+        count = len(definitions)
+        width = max((len(d["nodes"]) for d in definitions), default=1)
+        self.nodes = np.zeros((count, width), dtype=np.int64)
+        self.delays = np.zeros((count, max(width - 1, 1)), dtype=np.int64)
+        self.volumes = np.zeros((count, max(width - 1, 1)), dtype=np.float64)
+        self.lengths = np.zeros(count, dtype=np.int64)
+        self.start_probability = np.zeros(count, dtype=np.float64)
+        for i, d in enumerate(definitions):
+            missing = [c for c in d["nodes"] if c not in container_index]
+            if missing:
+                raise ValueError(f"Chain '{d['name']}' references unknown containers {missing}")
+            hops = len(d["nodes"]) - 1
+            if hops < 1 or len(d["volumes"]) != hops or len(d.get("delays", [])) < hops - 1:
+                raise ValueError(f"Chain '{d['name']}' needs >= 2 nodes, one volume per hop and a delay between hops")
+            self.nodes[i, :hops + 1] = [container_index[c] for c in d["nodes"]]
+            self.delays[i, :hops - 1] = d.get("delays", [])[:hops - 1]
+            self.volumes[i, :hops] = d["volumes"]
+            self.lengths[i] = hops + 1
+            self.start_probability[i] = d.get("start_probability", 0.02)
+        self.container_chains: Dict[str, str] = {}
+        for name, d in zip(self.names, definitions):
+            for container_id in d["nodes"]:
+                self.container_chains[container_id] = name
+        self.reset()
+
+    @classmethod
+    def from_file(cls, path: str, container_index: Dict[str, int]) -> "ChainEngine":
+        with open(path) as f:
+            config = json.load(f)
+        return cls(config["chains"], container_index)
+
+    def __len__(self):
+        return len(self.names)
+
+    def reset(self):
+        count = len(self.names)
+        self.active = np.zeros(count, dtype=bool)
+        self.stage = np.full(count, -1, dtype=np.int64)
+        self.countdown = np.zeros(count, dtype=np.int64)
+        self.active_names: List[str] = []
+
+    def start(self, indices) -> np.ndarray:
+        indices = np.asarray(indices, dtype=np.int64)
+        indices = indices[~self.active[indices]]
+        self.active[indices] = True
+        self.stage[indices] = 0
+        self.countdown[indices] = 0
+        if len(indices):
+            self._refresh_names()
+        return indices
+
+    def index(self, name: str) -> int:
+        if name not in self.names:
+            raise ValueError(f"Unknown chain '{name}', expected one of {tuple(self.names)}")
+        return self.names.index(name)
+
+    def _refresh_names(self):
+        self.active_names = [self.names[i] for i in np.flatnonzero(self.active)]
+
+    def tick(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        stage = self.stage
+        finished = self.active & (stage >= self.lengths - 1)
+        running = self.active & ~finished
+        fire = running & (self.countdown <= 0)
+        self.countdown[running & ~fire] -= 1
+
+        chains = np.flatnonzero(fire)
+        hop = stage[chains]
+        src = self.nodes[chains, hop]
+        dst = self.nodes[chains, hop + 1]
+        volume = self.volumes[chains, hop]
+        stage[chains] = hop + 1
+        self.countdown[chains] = self.delays[chains, hop]
+
+        if finished.any():
+            self.active[finished] = False
+            stage[finished] = -1
+            self._refresh_names()
+        return src, dst, volume
+
+    def random_starts(self, rng: np.random.Generator) -> np.ndarray:
+        draws = rng.random(len(self.names)) < self.start_probability
+        return self.start(np.flatnonzero(draws & ~self.active))
+
+def load_chains(path: Optional[str], container_index: Dict[str, int]) -> ChainEngine:
+    return ChainEngine.from_file(path or DEFAULT_CHAINS_PATH, container_index)
@@ -0,0 +1,124 @@
+import numpy as np
+from scipy import sparse
+from typing import Optional, Tuple
+from simulation.topology import NetworkTopology
+
+def placement_move_deltas(D: np.ndarray, p: np.ndarray, inbound: np.ndarray, outbound: Optional[np.ndarray] = None,
+                          rows: Optional[np.ndarray] = None,
+                          blocked: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+     
+    used = inbound.any(axis=0) if outbound is None else inbound.any(axis=0) | outbound.any(axis=0)
+    if not used.all():
+         
+        cols = np.flatnonzero(used)
+        inbound, p_used = inbound[:, cols], p[cols]
+        outbound = outbound[:, cols] if outbound is not None else None
+    else:
+        p_used = p
+    cost_at = inbound @ D[p_used, :]
+    if outbound is not None:
+        cost_at = cost_at + outbound @ D[:, p_used].T
+    rows = np.arange(len(cost_at)) if rows is None else np.asarray(rows)
+    delta = cost_at - cost_at[np.arange(len(rows)), p[rows]][:, None]
+    if blocked is not None:
+        delta[:, blocked] = np.inf
+    return cost_at, delta
+
+class CostEngine:
+    def __init__(self, topology: NetworkTopology, locality_reward: float = 100.0):
+        self.topology = topology
+        self.locality_reward = locality_reward
+        self.traffic: Optional[np.ndarray] = None
+        self._coo: Optional[sparse.coo_matrix] = None
+        self._csc: Optional[sparse.csc_matrix] = None
+        self.network_cost = 0.0
+        self.colocated_flows = 0
+         
+        topology.add_listener(self.recompute)
+
+    @property
+    def locality_bonus(self) -> float:
+        return self.locality_reward * self.colocated_flows
+
+    def set_traffic(self, traffic: np.ndarray):
+        self.traffic = traffic
+        self._coo = traffic.tocoo() if sparse.issparse(traffic) else None
+        self._csc = None
+        self.recompute()
+
+    def recompute(self):
+        if self.traffic is None:
+            self.network_cost = 0.0
+            self.colocated_flows = 0
+            return
+        p = self.topology.placement
+        if self._coo is not None:
+            src, dst, volume = p[self._coo.row], p[self._coo.col], self._coo.data
+            self.network_cost = float((volume * self.topology.distance_matrix[src, dst]).sum(dtype=np.float64))
+            self.colocated_flows = int(np.count_nonzero((volume > 0) & (src == dst)))
+            return
+        T = self.traffic
+        pair_dist = self.topology.distance_matrix[p[:, None], p[None, :]]
+        self.network_cost = float((T * pair_dist).sum(dtype=np.float64))
+        colocated = p[:, None] == p[None, :]
+        self.colocated_flows = int(np.count_nonzero((T > 0) & colocated))
+
+    def _flows(self, container_idx: int):
+        if self._coo is not None:
+            if self._csc is None:
+                self._csc = self.traffic.tocsc()
+            row = self.traffic.getrow(container_idx).toarray().ravel().astype(np.float64)
+            col = self._csc.getcol(container_idx).toarray().ravel().astype(np.float64)
+        else:
+            row = self.traffic[container_idx].astype(np.float64)
+            col = self.traffic[:, container_idx].astype(np.float64)
+        row[container_idx] = 0.0
+        col[container_idx] = 0.0
+        return row, col
+
+    def move_delta(self, container_idx: int, server_idx: int) -> float:
+        if self.traffic is None:
+            return 0.0
+        p = self.topology.placement
+        old = p[container_idx]
+        if old == server_idx:
+            return 0.0
+        D = self.topology.distance_matrix
+        row, col = self._flows(container_idx)
+        delta = row @ (D[server_idx, p] - D[old, p]) + col @ (D[p, server_idx] - D[p, old])
+        return float(delta)
+
+    def move_deltas(self, container_idx: int) -> np.ndarray:
+        num_servers = len(self.topology.servers)
+        if self.traffic is None:
+            return np.zeros(num_servers)
+        row, col = self._flows(container_idx)
+        _, delta = placement_move_deltas(self.topology.distance_matrix, self.topology.placement, col[None, :],
+                                         row[None, :], rows=[container_idx])
+        return delta[0]
+
+    def _colocated_delta(self, container_idx: int, server_idx: int) -> int:
+        p = self.topology.placement
+        old = p[container_idx]
+        row, col = self._flows(container_idx)
+        active = (row > 0).astype(np.int64) + (col > 0)
+        return int(active[p == server_idx].sum() - active[p == old].sum())
+
+    def apply_placement(self, placement: np.ndarray) -> bool:
+        if not self.topology.set_placement(placement):
+            return False
+        self.recompute()
+        return True
+
+    def apply_move(self, container_idx: int, server_idx: int) -> float:
+        container_id = self.topology.container_ids[container_idx]
+        server_id = self.topology.servers[server_idx]
+        if self.topology.placement[container_idx] == server_idx:
+            return 0.0
+        delta = self.move_delta(container_idx, server_idx)
+        colocated_delta = self._colocated_delta(container_idx, server_idx) if self.traffic is not None else 0
+        if not self.topology.move_container(container_id, server_id):
+            return 0.0
+        self.network_cost += delta
+        self.colocated_flows += colocated_delta
+        return delta
@@ -1,128 +1,438 @@
 import networkx as nx
+import numpy as np
 import random
-from typing import List, Dict, Tuple
+from scipy import sparse
+from typing import Callable, List, Dict, Tuple, Optional, Set
+
+class ClosedFormDistances:
+     
+     
+     
+    def __init__(self, pod: np.ndarray, rack: np.ndarray, level_distances: Tuple[float, float, float],
+                 dtype=np.float32):
+        self.pod = pod
+        self.rack = rack
+        self.level_distances = tuple(level_distances)
+        self.dtype = np.dtype(dtype)
+        self.shape = (len(pod), len(pod))
+        self._levels = np.array((0.0,) + self.level_distances, dtype=self.dtype)[::-1].copy()
+
+    def _indices(self, key) -> Tuple[np.ndarray, np.ndarray]:
+        i, j = key
+        n = self.shape[0]
+        i_slice, j_slice = isinstance(i, slice), isinstance(j, slice)
+        i = np.arange(n)[i] if i_slice else np.asarray(i)
+        j = np.arange(n)[j] if j_slice else np.asarray(j)
+        if i_slice and j_slice:
+            return i[:, None], j[None, :]
+        if j_slice:
+            return i[..., None], j
+        if i_slice:
+            return i.reshape(i.shape + (1,) * j.ndim), j
+        return i, j
+
+    def __getitem__(self, key) -> np.ndarray:
+        i, j = self._indices(key)
+         
+        same = (self.pod[i] == self.pod[j]).astype(np.int8)
+        same += self.rack[i] == self.rack[j]
+        same += i == j
+        return self._levels[same]
+
+    @property
+    def T(self) -> "ClosedFormDistances":
+        return self
+
+    def astype(self, dtype) -> "ClosedFormDistances":
+        return ClosedFormDistances(self.pod, self.rack, self.level_distances, dtype)
+
+    def toarray(self) -> np.ndarray:
+        return self[:, :]
+
+    def __array__(self, dtype=None, copy=None):
+        return self.toarray() if dtype is None else self.toarray().astype(dtype)
 
 class NetworkTopology:
-    def __init__(self, num_pods: int = 4, servers_per_pod: int = 4):
-        self.graph = nx.Graph()
+    kind = "tree"
+    _server_layer = 2
+
+    def __init__(self, num_pods: int = 4, servers_per_pod: int = 4, seed: Optional[int] = None,
+                 server_capacity: int = 10):
         self.num_pods = num_pods
         self.servers_per_pod = servers_per_pod
-        self.servers: List[str] = []
-        self.containers: Dict[str, str] = {}  
-        
+        self.default_capacity = server_capacity
+        self._init_state(seed)
         self._build_topology()
+        self._rebuild_caches()
+
+    def _init_state(self, seed: Optional[int]):
+        self.rng = random.Random(seed)
+        self.servers: List[str] = []
+        self.pod_servers: List[List[str]] = [[] for _ in range(self.num_pods)]
+        self.containers: Dict[str, str] = {}
+        self.server_index: Dict[str, int] = {}
+        self.container_ids: List[str] = []
+        self.container_index: Dict[str, int] = {}
+        self.placement = np.zeros(0, dtype=np.int64)
+        self.distance_matrix = np.zeros((0, 0), dtype=np.float32)
+        self.edges: List[Tuple[str, str]] = []
+        self.path_incidence: Optional[sparse.csr_matrix] = None
+        self.server_pod = []
+        self.server_rack = []
+        self.server_capacity = []
+        self.occupancy = np.zeros(0, dtype=np.int64)
+        self.active_servers: Set[str] = set()
+        self.level_distances = (0.0, 0.0, 0.0)
+        self._nodes: List[Tuple[str, Dict]] = []
+        self._links: List[Tuple[str, str, float, int, int, float]] = []
+        self._graph: Optional[nx.Graph] = None
+        self._custom_links = False
+        self._nodes_payload: Optional[List[Dict]] = None
+        self._listeners: List[Callable[[], None]] = []
+
+    def add_listener(self, callback: Callable[[], None]):
+        self._listeners.append(callback)
+
+    def _add_node(self, node_id: str, **attrs):
+        self._nodes.append((node_id, attrs))
+
+    def _add_server(self, server_id: str, pod: int, rack: int, capacity: Optional[int] = None):
+        if capacity is None:
+            capacity = self.default_capacity
+        self._add_node(server_id, type="server", layer=self._server_layer, capacity=capacity)
+        self.server_capacity.append(capacity)
+        self.server_pod.append(pod)
+        self.server_rack.append(rack)
+        self.pod_servers[pod].append(server_id)
+        self.servers.append(server_id)
+
+    def _add_link(self, u: str, v: str, weight: float, level: int, group: int, divisor: float = 1.0):
+        self._links.append((u, v, weight, level, group, divisor))
 
-    def _build_topology(self):  
+    def _build_topology(self):
         self.root_id = "Core_Switch"
-        self.graph.add_node(self.root_id, type="core", layer=0)
-        
+        self._add_node(self.root_id, type="core", layer=0)
+
         for i in range(self.num_pods):
             pod_id = f"Agg_Switch_{i}"
-            self.graph.add_node(pod_id, type="aggregation", layer=1)
-            self.graph.add_edge(self.root_id, pod_id, weight=10)  
-            
+            self._add_node(pod_id, type="aggregation", layer=1)
+            self._add_link(self.root_id, pod_id, weight=10, level=2, group=i)
+
             for j in range(self.servers_per_pod):
                 server_id = f"Server_{i}_{j}"
-                self.graph.add_node(server_id, type="server", layer=2, capacity=10)
-                self.graph.add_edge(pod_id, server_id, weight=1)  
-                self.servers.append(server_id)
+                self._add_server(server_id, pod=i, rack=i)
+                self._add_link(pod_id, server_id, weight=1, level=0, group=len(self.servers) - 1)
+
+        self.level_distances = (2.0, 2.0, 22.0)
+
+    @property
+    def graph(self) -> nx.Graph:
+        if self._graph is None:
+            graph = nx.Graph()
+            for node_id, attrs in self._nodes:
+                graph.add_node(node_id, **attrs)
+            for u, v, weight, *_ in self._links:
+                graph.add_edge(u, v, weight=weight)
+            self._graph = graph
+        return self._graph
+
+    def _rebuild_caches(self):
+        self.server_index = {s: i for i, s in enumerate(self.servers)}
+        self.server_pod = np.asarray(self.server_pod, dtype=np.int64)
+        self.server_rack = np.asarray(self.server_rack, dtype=np.int64)
+        self.server_capacity = np.asarray(self.server_capacity, dtype=np.int64)
+        self.path_incidence = None
+        self._nodes_payload = None
+        if self._custom_links:
+            self.edges = list(self.graph.edges)
+            self._build_distance_matrix()
+        else:
+            self.edges = [(u, v) for u, v, *_ in self._links]
+            self._link_level = np.array([l[3] for l in self._links], dtype=np.int64)
+            self._link_group = np.array([l[4] for l in self._links], dtype=np.int64)
+            self._link_divisor = np.array([l[5] for l in self._links], dtype=np.float64)
+            self._build_closed_form_distances()
+        for callback in self._listeners:
+            callback()
+
+    def _build_closed_form_distances(self):
+        self.distance_matrix = ClosedFormDistances(self.server_pod, self.server_rack, self.level_distances)
+
+    def _build_distance_matrix(self):
+        n = len(self.servers)
+        self.distance_matrix = np.full((n, n), np.inf, dtype=np.float32)
+        np.fill_diagonal(self.distance_matrix, 0.0)
+        for src, lengths in nx.all_pairs_dijkstra_path_length(self.graph, weight='weight'):
+            i = self.server_index.get(src)
+            if i is None: continue
+            for dst, dist in lengths.items():
+                j = self.server_index.get(dst)
+                if j is not None:
+                    self.distance_matrix[i, j] = dist
+
+    def _build_path_incidence(self):
+        edge_index = {}
+        for e, (u, v) in enumerate(self.edges):
+            edge_index[(u, v)] = e
+            edge_index[(v, u)] = e
+        n = len(self.servers)
+        rows, cols = [], []
+        server_set = set(self.servers)
+        for src, paths in nx.all_pairs_shortest_path(self.graph):
+            if src not in server_set: continue
+            i = self.server_index[src]
+            for dst, path in paths.items():
+                if dst not in server_set or dst == src: continue
+                pair = i * n + self.server_index[dst]
+                for k in range(len(path) - 1):
+                    rows.append(pair)
+                    cols.append(edge_index[(path[k], path[k + 1])])
+        data = np.ones(len(rows), dtype=np.float32)
+        self.path_incidence = sparse.csr_matrix((data, (rows, cols)), shape=(n * n, len(self.edges)))
+
+    def set_link_weight(self, u: str, v: str, weight: float):
+        self.graph.add_edge(u, v, weight=weight)
+        self._custom_links = True
+        self._rebuild_caches()
+
+    def remove_link(self, u: str, v: str):
+        self.graph.remove_edge(u, v)
+        self._custom_links = True
+        self._rebuild_caches()
+
+    def seed(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
 
     def place_containers(self, num_containers: int):
+        if num_containers > int(self.server_capacity.sum()):
+            raise ValueError(f"{num_containers} containers exceed total server capacity {int(self.server_capacity.sum())}")
         self.containers.clear()
-        
-         
+        self.container_ids = [f"Container_{i}" for i in range(num_containers)]
+        self.container_index = {c: i for i, c in enumerate(self.container_ids)}
+        self.placement = np.zeros(num_containers, dtype=np.int64)
+        self.occupancy = np.zeros(len(self.servers), dtype=np.int64)
+        self.active_servers = set()
+
+        def pick(candidates):
+            server_id = self.rng.choice(candidates)
+            if not self.has_room(server_id):
+                 
+                free = [s for s in candidates if self.has_room(s)] or [s for s in self.servers if self.has_room(s)]
+                server_id = self.rng.choice(free)
+            return server_id
+
         def get_server_in_pod(pod_index):
-             
-             
-            srv_idx = random.randint(0, self.servers_per_pod - 1)
-            return f"Server_{pod_index}_{srv_idx}"
-
-        for i in range(num_containers):
-            container_id = f"Container_{i}"
-            
-             
+            return pick(self.pod_servers[pod_index % self.num_pods])
+
+        for i, container_id in enumerate(self.container_ids):
             if i == 0:
-                 
                 server_id = get_server_in_pod(0)
             elif i == 1:
-                 
                 server_id = get_server_in_pod(2)
             elif i == 2:
-                 
                 server_id = get_server_in_pod(1)
             elif i == 3:
-                 
                 server_id = get_server_in_pod(3)
             else:
-                 
-                server_id = random.choice(self.servers)
-                
+                server_id = pick(self.servers)
+
             self.containers[container_id] = server_id
+            self.placement[i] = self.server_index[server_id]
+            self._occupy(self.placement[i])
+
+    def has_room(self, server_id: str) -> bool:
+        idx = self.server_index[server_id]
+        return self.occupancy[idx] < self.server_capacity[idx]
+
+    def _occupy(self, server_idx: int):
+        self.occupancy[server_idx] += 1
+        if self.occupancy[server_idx] == 1:
+            self.active_servers.add(self.servers[server_idx])
+
+    def _vacate(self, server_idx: int):
+        self.occupancy[server_idx] -= 1
+        if self.occupancy[server_idx] == 0:
+            self.active_servers.discard(self.servers[server_idx])
 
     def move_container(self, container_id: str, new_server_id: str):
-        
-        if container_id in self.containers and new_server_id in self.servers:
-            self.containers[container_id] = new_server_id
+        if container_id not in self.containers or new_server_id not in self.server_index:
+            return False
+        c = self.container_index[container_id]
+        old, new = self.placement[c], self.server_index[new_server_id]
+        if old == new:
             return True
-        return False
+        if not self.has_room(new_server_id):
+            return False
+        self.containers[container_id] = new_server_id
+        self.placement[c] = new
+        self._vacate(old)
+        self._occupy(new)
+        return True
 
-    def get_distance(self, server_a: str, server_b: str) -> int:
-        
+    def set_placement(self, placement: np.ndarray) -> bool:
+         
+         
+        placement = np.asarray(placement, dtype=np.int64)
+        occupancy = np.bincount(placement, minlength=len(self.servers))
+        if len(placement) != len(self.placement) or np.any(occupancy > self.server_capacity):
+            return False
+        self.placement = placement.copy()
+        self.occupancy = occupancy.astype(np.int64)
+        self.active_servers = {self.servers[s] for s in np.flatnonzero(occupancy)}
+        for c, s in zip(self.container_ids, placement):
+            self.containers[c] = self.servers[s]
+        return True
+
+    def get_distance(self, server_a: str, server_b: str) -> float:
         if server_a == server_b:
             return 0
-        return nx.shortest_path_length(self.graph, source=server_a, target=server_b, weight='weight')
+        return float(self.distance_matrix[self.server_index[server_a], self.server_index[server_b]])
+
+    def _nodes_data(self) -> List[Dict]:
+        if self._nodes_payload is None:
+            self._nodes_payload = [{"id": n, **self.graph.nodes[n]} for n in self.graph.nodes]
+        return self._nodes_payload
 
     def get_state(self):
-        
         return {
-            "nodes": [{"id": n, **self.graph.nodes[n]} for n in self.graph.nodes],
-            "links": [{"source": u, "target": v} for u, v in self.graph.edges],
+            "nodes": self._nodes_data(),
+            "links": [{"source": u, "target": v} for u, v in self.edges],
             "containers": self.containers
         }
 
-    def get_state_with_traffic(self, traffic_matrix: Dict[str, Dict[str, float]]):
-       
+    def _traffic_array(self, traffic_matrix) -> np.ndarray:
+        if hasattr(traffic_matrix, "array"):
+            return traffic_matrix.array
+        if isinstance(traffic_matrix, np.ndarray) or sparse.issparse(traffic_matrix):
+            return traffic_matrix
+        T = np.zeros((len(self.placement), len(self.placement)), dtype=np.float32)
+        for src_c, destinations in (traffic_matrix or {}).items():
+            if src_c not in self.container_index: continue
+            for dst_c, volume in destinations.items():
+                if dst_c in self.container_index:
+                    T[self.container_index[src_c], self.container_index[dst_c]] += volume
+        return T
+
+    def _server_flows(self, traffic_matrix) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        T = self._traffic_array(traffic_matrix)
+        if sparse.issparse(T):
+            coo = T.tocoo()
+            src, dst, volume = coo.row, coo.col, coo.data
+        else:
+            src, dst = np.nonzero(T)
+            volume = T[src, dst]
+        p = self.placement
+        return p[src], p[dst], volume.astype(np.float64)
+
+    @staticmethod
+    def _boundary_traffic(a: np.ndarray, b: np.ndarray, volume: np.ndarray, num_groups: int) -> np.ndarray:
          
-        link_loads = {(u, v): 0.0 for u, v in self.graph.edges}
          
-        for u, v in list(link_loads.keys()):
-            link_loads[(v, u)] = 0.0
+        inside = np.flatnonzero(a == b)
+        total = np.bincount(a, weights=volume, minlength=num_groups) + np.bincount(b, weights=volume, minlength=num_groups)
+        return total - 2 * np.bincount(a[inside], weights=volume[inside], minlength=num_groups)
 
-         
-        if traffic_matrix:
-            for src_c, destinations in traffic_matrix.items():
-                if src_c not in self.containers: continue
-                src_s = self.containers[src_c]
-                
-                for dst_c, volume in destinations.items():
-                    if dst_c not in self.containers: continue
-                    dst_s = self.containers[dst_c]
-                    
-                    if src_s == dst_s: continue  
-                    
-                     
-                    path = nx.shortest_path(self.graph, src_s, dst_s)
-                    
-                     
-                    for i in range(len(path) - 1):
-                        u, v = path[i], path[i+1]
-                        if (u, v) in link_loads:
-                            link_loads[(u, v)] += volume
-                        elif (v, u) in link_loads:
-                            link_loads[(v, u)] += volume
-  
-        
-        links_data = []
-        for u, v in self.graph.edges:
-            load = link_loads.get((u, v), 0) + link_loads.get((v, u), 0)
-            links_data.append({
-                "source": u, 
-                "target": v, 
-                "load": load
-            })
+    def get_link_loads(self, traffic_matrix) -> np.ndarray:
+        a, b, volume = self._server_flows(traffic_matrix)
+        n = len(self.servers)
+        if self._custom_links:
+            if self.path_incidence is None:
+                self._build_path_incidence()
+            pairs, inverse = np.unique(a * n + b, return_inverse=True)
+            return self.path_incidence[pairs].T @ np.bincount(inverse, weights=volume, minlength=len(pairs))
+
+        num_racks = int(self.server_rack.max()) + 1 if n else 0
+        rack, pod = self.server_rack, self.server_pod
+        crossing = np.concatenate([
+            self._boundary_traffic(a, b, volume, n),
+            self._boundary_traffic(rack[a], rack[b], volume, num_racks),
+            self._boundary_traffic(pod[a], pod[b], volume, self.num_pods),
+        ])
+        offsets = np.array([0, n, n + num_racks])
+        return crossing[offsets[self._link_level] + self._link_group] / self._link_divisor
+
+    def get_state_with_traffic(self, traffic_matrix):
+        loads = self.get_link_loads(traffic_matrix)
+        links_data = [
+            {"source": u, "target": v, "load": float(load)}
+            for (u, v), load in zip(self.edges, loads)
+        ]
 
         return {
-            "nodes": [{"id": n, **self.graph.nodes[n]} for n in self.graph.nodes],
+            "nodes": self._nodes_data(),
             "links": links_data,
             "containers": self.containers
         }
+
+class FatTreeTopology(NetworkTopology):
+    kind = "fat_tree"
+    _server_layer = 3
+
+    def __init__(self, k: int = 4, seed: Optional[int] = None, link_weight: float = 1.0, server_capacity: int = 10):
+        if k < 2 or k % 2:
+            raise ValueError("Fat-tree arity k must be an even number >= 2")
+        self.k = k
+        self.link_weight = link_weight
+        half = k // 2
+        super().__init__(num_pods=k, servers_per_pod=half * half, seed=seed, server_capacity=server_capacity)
+
+    def _build_topology(self):
+        k, half, w = self.k, self.k // 2, self.link_weight
+        for c in range(half * half):
+            self._add_node(f"Core_{c}", type="core", layer=0)
+        for p in range(k):
+            for a in range(half):
+                agg_id = f"Agg_{p}_{a}"
+                self._add_node(agg_id, type="aggregation", layer=1)
+
+                for c in range(half):
+                    self._add_link(agg_id, f"Core_{a * half + c}", weight=w, level=2, group=p, divisor=half * half)
+            for e in range(half):
+                edge_id = f"Edge_{p}_{e}"
+                rack = p * half + e
+                self._add_node(edge_id, type="edge", layer=2)
+                for a in range(half):
+                    self._add_link(edge_id, f"Agg_{p}_{a}", weight=w, level=1, group=rack, divisor=half)
+                for h in range(half):
+                    server_id = f"Server_{p}_{e}_{h}"
+                    self._add_server(server_id, pod=p, rack=rack)
+                    self._add_link(edge_id, server_id, weight=w, level=0, group=len(self.servers) - 1)
+
+        self.level_distances = (2 * w, 4 * w, 6 * w)
+
+class LeafSpineTopology(NetworkTopology):
+    kind = "leaf_spine"
+
+    def __init__(self, num_leaves: int = 4, num_spines: int = 2, servers_per_leaf: int = 4,
+                 seed: Optional[int] = None, link_weight: float = 1.0, server_capacity: int = 10):
+        self.num_spines = num_spines
+        self.link_weight = link_weight
+        super().__init__(num_pods=num_leaves, servers_per_pod=servers_per_leaf, seed=seed,
+                         server_capacity=server_capacity)
+
+    def _build_topology(self):
+        w = self.link_weight
+        for s in range(self.num_spines):
+            self._add_node(f"Spine_{s}", type="core", layer=0)
+        for l in range(self.num_pods):
+            leaf_id = f"Leaf_{l}"
+            self._add_node(leaf_id, type="aggregation", layer=1)
+            for s in range(self.num_spines):
+                self._add_link(leaf_id, f"Spine_{s}", weight=w, level=2, group=l, divisor=self.num_spines)
+            for h in range(self.servers_per_pod):
+                server_id = f"Server_{l}_{h}"
+                self._add_server(server_id, pod=l, rack=l)
+                self._add_link(leaf_id, server_id, weight=w, level=0, group=len(self.servers) - 1)
+
+        self.level_distances = (2 * w, 2 * w, 4 * w)
+
+TOPOLOGIES = {
+    NetworkTopology.kind: NetworkTopology,
+    FatTreeTopology.kind: FatTreeTopology,
+    LeafSpineTopology.kind: LeafSpineTopology,
+}
+
+def build_topology(kind: str = "tree", seed: Optional[int] = None, **params) -> NetworkTopology:
+    if kind not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology kind '{kind}', expected one of {sorted(TOPOLOGIES)}")
+    return TOPOLOGIES[kind](seed=seed, **params)
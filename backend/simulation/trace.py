@@ -0,0 +1,125 @@
+import json
+import os
+import numpy as np
+from scipy import sparse
+from typing import Any, Dict, List
+
+COO_FILES = ("rows.i32", "cols.i32", "values.f32", "nnz.i64")
+
+class TraceRecorder:
+    def __init__(self, path: str, num_containers: int, flush_every: int = 64, sparse_traffic: bool = False):
+        self.path = path
+        self.num_containers = num_containers
+        self.flush_every = flush_every
+        self.sparse_traffic = sparse_traffic
+        self.steps = 0
+        os.makedirs(path, exist_ok=True)
+        names = COO_FILES if sparse_traffic else ("traffic.f32",)
+        self._files = [open(os.path.join(path, name), "wb") for name in names]
+        self._events = open(os.path.join(path, "events.jsonl"), "w")
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {"num_containers": self.num_containers, "steps": self.steps, "dtype": "float32",
+                "format": "coo" if self.sparse_traffic else "dense"}
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    def record(self, step: int, matrix, events: Dict[str, Any]):
+        if self.sparse_traffic:
+             
+            coo = sparse.coo_matrix(matrix)
+            rows, cols, values, nnz = self._files
+            rows.write(coo.row.astype(np.int32).tobytes())
+            cols.write(coo.col.astype(np.int32).tobytes())
+            values.write(coo.data.astype(np.float32).tobytes())
+            nnz.write(np.int64(coo.nnz).tobytes())
+        else:
+            self._files[0].write(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+        self._events.write(json.dumps({"step": step, **events}) + "\n")
+        self.steps += 1
+        if self.steps % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        for f in self._files:
+            f.flush()
+        self._events.flush()
+        self._write_meta()
+
+    def close(self):
+        if self._events.closed:
+            return
+        self.flush()
+        for f in self._files:
+            f.close()
+        self._events.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class TraceReader:
+    def __init__(self, path: str):
+        self.path = path
+        self._open()
+
+    def _open(self):
+        with open(os.path.join(self.path, "meta.json")) as f:
+            meta = json.load(f)
+        self.num_containers = meta["num_containers"]
+        self.format = meta.get("format", "dense")
+        n = self.num_containers
+        if self.format == "coo":
+            steps = self._open_coo()
+        else:
+            traffic_path = os.path.join(self.path, "traffic.f32")
+            steps = os.path.getsize(traffic_path) // (n * n * 4)
+        if steps == 0:
+            raise ValueError(f"Trace at {self.path} contains no steps")
+        self.steps = steps
+        if self.format != "coo":
+            self.traffic = np.memmap(traffic_path, dtype=np.float32, mode="r", shape=(steps, n, n))
+        with open(os.path.join(self.path, "events.jsonl")) as f:
+            self.events: List[Dict[str, Any]] = [json.loads(line) for line in f][:steps]
+
+    def _open_coo(self) -> int:
+        paths = [os.path.join(self.path, name) for name in COO_FILES]
+        nnz = np.fromfile(paths[3], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(nnz)])
+         
+        stored = min(os.path.getsize(path) // 4 for path in paths[:3])
+        steps = int(np.searchsorted(self.offsets, stored, side="right")) - 1
+        total = int(self.offsets[steps])
+        self.rows, self.cols, self.values = [
+            np.memmap(path, dtype=dtype, mode="r", shape=(total,)) if total else np.zeros(0, dtype=dtype)
+            for path, dtype in zip(paths[:3], (np.int32, np.int32, np.float32))]
+        return steps
+
+    def __len__(self):
+        return self.steps
+
+    def matrix(self, step: int):
+        step %= self.steps
+        if self.format != "coo":
+            return self.traffic[step]
+        start, end = self.offsets[step], self.offsets[step + 1]
+        n = self.num_containers
+        return sparse.csr_matrix((self.values[start:end], (self.rows[start:end], self.cols[start:end])), shape=(n, n))
+
+    def step_events(self, step: int) -> Dict[str, Any]:
+        return self.events[step % len(self.events)]
+
+    def fingerprint(self) -> str:
+        meta = os.stat(os.path.join(self.path, "meta.json"))
+        return f"{os.path.abspath(self.path)}:{meta.st_mtime_ns}:{len(self)}"
+
+    def __getstate__(self):
+         
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._open()
@@ -1,125 +1,226 @@
-import random
+import copy
+import hashlib
+import json
 import numpy as np
-from typing import List, Dict, Tuple, Optional
-
-class ServiceChain:
-    def __init__(self, name: str, nodes: List[str], delays: List[int], volumes: List[float]):
-        self.name = name
-        self.nodes = nodes  
-        self.delays = delays  
-        self.volumes = volumes  
-        self.active = False
-        self.current_step_idx = -1
-        self.steps_since_last_trigger = 0
-
-    def start(self):
-        if not self.active:
-            self.active = True
-            self.current_step_idx = 0
-            self.steps_since_last_trigger = 0
+from scipy import sparse
+from collections.abc import Mapping
+from typing import List, Dict, Optional
+from simulation.trace import TraceRecorder, TraceReader
+from simulation.chains import ChainEngine, load_chains
 
-    def reset(self):
-        self.active = False
-        self.current_step_idx = -1
-        self.steps_since_last_trigger = 0
+class TrafficMatrixView(Mapping):
+     
+     
+    def __init__(self, matrix: np.ndarray, container_ids: List[str], container_index: Dict[str, int]):
+        self.array = matrix
+        self._ids = container_ids
+        self._index = container_index
 
-    def tick(self) -> Optional[Tuple[str, str, float]]:
-        if not self.active:
-            return None
-        result = None
+    def __getitem__(self, src: str) -> Dict[str, float]:
+        i = self._index[src]
+        if sparse.issparse(self.array):
+            row = self.array.getrow(i)
+            return {self._ids[j]: float(v) for j, v in zip(row.indices, row.data) if v}
+        row = self.array[i]
+        cols = np.flatnonzero(row)
+        return {self._ids[j]: float(row[j]) for j in cols}
 
-        if self.current_step_idx < len(self.nodes) - 1:
-             
-            target_delay = 0 if self.current_step_idx == 0 else self.delays[self.current_step_idx - 1]
-            
-            if self.steps_since_last_trigger >= target_delay:
-                 
-                src = self.nodes[self.current_step_idx]
-                dst = self.nodes[self.current_step_idx + 1]
-                vol = self.volumes[self.current_step_idx]
-                result = (src, dst, vol)
-                
-                 
-                self.current_step_idx += 1
-                self.steps_since_last_trigger = 0
-            else:
-                self.steps_since_last_trigger += 1
-        else:
-             
-            self.active = False
-            
-        return result
+    def column_sums(self) -> np.ndarray:
+        return np.asarray(self.array.sum(axis=0, dtype=np.float64)).ravel()
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
 
 class TrafficGenerator:
-    def __init__(self, num_containers: int):
+    def __init__(self, num_containers: int, seed: Optional[int] = None, sparse_traffic: bool = False,
+                 chains_path: Optional[str] = None):
         self.num_containers = num_containers
-        self.traffic_matrix: Dict[str, Dict[str, float]] = {}
+        self.sparse_traffic = sparse_traffic
+        self.container_ids = [f"Container_{i}" for i in range(num_containers)]
+        self.container_index = {c: i for i, c in enumerate(self.container_ids)}
+        self.base_seed = seed
+        self.rng = np.random.default_rng(seed)
+        self._set_matrix(self._empty())
         
         self.base_load = 10.0
         self.drift_rate = 0.5
+        self.flow_probability = 0.1
+        self.recorder: Optional[TraceRecorder] = None
+        self.replay: Optional[TraceReader] = None
+        self.last_events: Dict[str, list] = {}
+        self._replay_chains: List[str] = []
         
          
-        self.chains = [
-             
-             
-            ServiceChain("Login Flow", ["Container_0", "Container_1", "Container_2"], [2, 2], [5000.0, 4000.0]),
-    
-            ServiceChain("Data Pipeline", ["Container_2", "Container_3", "Container_0"], [2, 2], [5000.0, 4000.0])
-        ]
+        self.chains_path = chains_path
+        self.chains: ChainEngine = load_chains(chains_path, self.container_index)
+
+    def fingerprint(self) -> str:
+         
+         
+        config = {
+            "num_containers": self.num_containers,
+            "sparse_traffic": self.sparse_traffic,
+            "base_load": self.base_load,
+            "drift_rate": self.drift_rate,
+            "flow_probability": self.flow_probability,
+            "chains": self.chains.names,
+            "trace": self.replay.fingerprint() if self.replay is not None else None,
+        }
+        digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode())
+        chains = self.chains
+        for array in (chains.nodes, chains.delays, chains.volumes, chains.lengths, chains.start_probability):
+            digest.update(array.tobytes())
+        return digest.hexdigest()[:12]
+
+    def seed(self, seed: Optional[int] = None):
+        self.base_seed = seed
+        self.rng = np.random.default_rng(seed)
+
+    def start_recording(self, path: str, flush_every: int = 64) -> TraceRecorder:
+        self.stop_recording()
+        self.recorder = TraceRecorder(path, self.num_containers, flush_every=flush_every,
+                                      sparse_traffic=self.sparse_traffic)
+        return self.recorder
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def load_trace(self, path: str):
+        replay = TraceReader(path)
+        if replay.num_containers != self.num_containers:
+            raise ValueError(f"Trace has {replay.num_containers} containers, generator has {self.num_containers}")
+        self.replay = replay
 
     def reset(self):
-        for chain in self.chains:
-            chain.reset()
-        self.traffic_matrix = {}
+        self._replay_chains = []
+        self.chains.reset()
+        self._set_matrix(self._empty())
+
+    def _empty(self):
+        n = self.num_containers
+        if self.sparse_traffic:
+            return sparse.csr_matrix((n, n), dtype=np.float32)
+        return np.zeros((n, n), dtype=np.float32)
+
+    def _sparse_flows(self, current_base: float) -> sparse.csr_matrix:
+        n = self.num_containers
+        pairs = n * (n - 1)
+        prob = self.flow_probability
+         
+         
+        size = int(pairs * prob + 6 * np.sqrt(pairs * prob) + 16)
+        flat = np.cumsum(self.rng.geometric(prob, size=size)) - 1
+        while flat[-1] < pairs:
+            flat = np.concatenate([flat, flat[-1] + np.cumsum(self.rng.geometric(prob, size=size))])
+        flat = flat[:np.searchsorted(flat, pairs)]
+        src = flat // (n - 1)
+        dst = flat % (n - 1)
+        dst += dst >= src
+        volumes = np.maximum(self.rng.normal(current_base, current_base * 0.2, size=len(flat)), 0.0)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        return sparse.csr_matrix((volumes.astype(np.float32), dst.astype(np.int32), indptr), shape=(n, n))
+
+    def _set_matrix(self, matrix: np.ndarray):
+        self.matrix = matrix
+        self.traffic_matrix = TrafficMatrixView(matrix, self.container_ids, self.container_index)
 
     def generate_temporal_traffic(self, step: int):
-        self.traffic_matrix = {}
+        if self.replay is not None:
+             
+            self.last_events = self.replay.step_events(step)
+            self._replay_chains = self.last_events.get("active_chains", [])
+            matrix = self.replay.matrix(step)
+            if sparse.issparse(matrix) != self.sparse_traffic:
+                matrix = sparse.csr_matrix(matrix) if self.sparse_traffic else matrix.toarray()
+            self._set_matrix(matrix)
+            return
+
+        n = self.num_containers
         cycle_pos = (np.sin(step / 60.0) + 1.0) / 2.0  
         current_base = self.base_load + (cycle_pos * 40.0) 
         
          
-        for i in range(self.num_containers):
-            src_id = f"Container_{i}"
-            self.traffic_matrix[src_id] = {}
-            for j in range(self.num_containers):
-                if i == j: continue
-                if random.random() < 0.1:
-                    dst_id = f"Container_{j}"
-                    vol = max(0, random.gauss(current_base, current_base * 0.2))
-                    self.traffic_matrix[src_id][dst_id] = vol
-
-        if not self.chains[0].active and random.random() < 0.02:
-            self.chains[0].start()
-            
-        if not self.chains[1].active and random.random() < 0.02:
-            self.chains[1].start()
+        if self.sparse_traffic:
+            matrix = self._sparse_flows(current_base)
+        else:
+            mask = self.rng.random((n, n)) < self.flow_probability
+            np.fill_diagonal(mask, False)
+            volumes = self.rng.normal(current_base, current_base * 0.2, size=(n, n))
+            matrix = np.where(mask, np.maximum(volumes, 0.0), 0.0).astype(np.float32)
 
-        
-        for chain in self.chains:
-            burst = chain.tick()
-            if burst:
-                src, dst, vol = burst
-                self._add_burst(self.traffic_matrix, src, dst, vol, volatility=0.2)
-        if random.random() < 0.05:
-            src = f"Container_{random.randint(0, self.num_containers-1)}"
-            dst = f"Container_{random.randint(0, self.num_containers-1)}"
-            if src != dst:
-                self._add_burst(self.traffic_matrix, src, dst, 2000.0, volatility=0.5)
-
-    def _add_burst(self, traffic, src, dst, mean_vol, volatility=0.0):
-        noise = random.gauss(0, mean_vol * volatility)
-        vol = max(0, mean_vol + noise)
-        if src not in traffic: traffic[src] = {}
-        traffic[src][dst] = vol
-        if dst not in traffic: traffic[dst] = {}
-        traffic[dst][src] = vol
-
-    def get_traffic(self):
+        chain_starts = [self.chains.names[i] for i in self.chains.random_starts(self.rng)]
+        src, dst, volume = self.chains.tick()
+        volume = np.maximum(volume + self.rng.normal(0.0, volume * 0.2), 0.0)
+        if self.rng.random() < 0.05:
+            a, b = self.rng.integers(0, n, size=2)
+            if a != b:
+                src, dst = np.append(src, a), np.append(dst, b)
+                volume = np.append(volume, max(0.0, 2000.0 + self.rng.normal(0, 2000.0 * 0.5)))
+
+        matrix = self._apply_bursts(matrix, src, dst, volume)
+        bursts = [[int(a), int(b), float(v)] for a, b, v in zip(src, dst, volume)]
+        self._set_matrix(matrix)
+        self.last_events = {"chain_starts": chain_starts, "bursts": bursts, "active_chains": self.get_active_chains()}
+        if self.recorder is not None:
+            self.recorder.record(step, matrix, self.last_events)
+
+    def _apply_bursts(self, matrix, src: np.ndarray, dst: np.ndarray, volume: np.ndarray):
+        if not len(src):
+            return matrix
+         
+        rows = np.column_stack([src, dst]).ravel()
+        cols = np.column_stack([dst, src]).ravel()
+        vol = np.repeat(np.asarray(volume, dtype=np.float32), 2)
+        if not sparse.issparse(matrix):
+            matrix[rows, cols] = vol
+            return matrix
+        n = self.num_containers
+        src, dst = rows.astype(np.int64), cols.astype(np.int64)
+        keys = src * n + dst
+        _, first = np.unique(keys[::-1], return_index=True)
+        last = len(keys) - 1 - first
+        coo = matrix.tocoo()
+        keep = ~np.isin(coo.row.astype(np.int64) * n + coo.col, keys)
+        rows = np.concatenate([coo.row[keep], src[last]])
+        cols = np.concatenate([coo.col[keep], dst[last]])
+        data = np.concatenate([coo.data[keep], vol[last]])
+        return sparse.csr_matrix((data, (rows, cols)), shape=(n, n))
+
+    def inject_burst(self, mean_vol: float = 2000.0):
+        src, dst = self.rng.choice(self.num_containers, size=2, replace=False)
+        volume = max(0.0, mean_vol + self.rng.normal(0, mean_vol * 0.5))
+        matrix = self.matrix.copy() if sparse.issparse(self.matrix) else np.array(self.matrix, dtype=np.float32)
+        self._set_matrix(self._apply_bursts(matrix, np.array([src]), np.array([dst]), np.array([volume])))
+        return [int(src), int(dst), float(volume)]
+
+    def get_traffic(self) -> TrafficMatrixView:
         return self.traffic_matrix
+
+    def get_traffic_array(self) -> np.ndarray:
+        return self.matrix
         
     def peek_traffic(self, step: int):
         self.generate_temporal_traffic(step)
         return self.traffic_matrix
 
     def get_active_chains(self):
-        return [c.name for c in self.chains if c.active]
+        if self.replay is not None:
+            return list(self._replay_chains)
+        return self.chains.active_names
+
+    def __deepcopy__(self, memo):
+         
+        clone = copy.copy(self)
+        memo[id(self)] = clone
+        for key, value in self.__dict__.items():
+            if key == "recorder":
+                clone.recorder = None
+            elif key != "replay":
+                setattr(clone, key, copy.deepcopy(value, memo))
+        return clone
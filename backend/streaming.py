@@ -0,0 +1,118 @@
+import asyncio
+import threading
+from typing import Any, Dict, Optional, Set
+
+def merge_deltas(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+    if newer.get("type") in ("snapshot", "closed"):
+        return newer
+     
+    merged = {**older, **newer}
+    merged["type"] = older["type"]
+    merged["containers"] = {**older.get("containers", {}), **newer.get("containers", {})}
+    merged["link_loads"] = {**older.get("link_loads", {}), **newer.get("link_loads", {})}
+    return merged
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.event = asyncio.Event()
+        self.coalesced = 0
+        self._pending: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def push(self, message: Dict[str, Any]):
+        with self._lock:
+            if self._pending is None:
+                self._pending = message
+            else:
+                self._pending = merge_deltas(self._pending, message)
+                self.coalesced += 1
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def next(self) -> Dict[str, Any]:
+        while True:
+            await self.event.wait()
+            with self._lock:
+                message, self._pending = self._pending, None
+                self.event.clear()
+            if message is not None:
+                return message
+
+class StateStreamer:
+    def __init__(self):
+        self.subscribers: Set[Subscriber] = set()
+        self._lock = threading.Lock()
+        self._last_containers: Dict[str, str] = {}
+        self._last_loads: Dict[str, float] = {}
+
+    @staticmethod
+    def _link_loads(state) -> Dict[str, float]:
+        return {f"{l['source']}|{l['target']}": round(float(l.get("load", 0.0)), 1) for l in state["links"]}
+
+    @staticmethod
+    def _metrics(state) -> Dict[str, Any]:
+        return {
+            "step": state["step"],
+            "network_cost": float(state["network_cost"]),
+            "active_servers": len(state["active_servers"]),
+        }
+
+    def snapshot(self, env) -> Dict[str, Any]:
+        return self.snapshot_from_state(env.get_current_state())
+
+    @classmethod
+    def snapshot_from_state(cls, state: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "type": "snapshot",
+            "nodes": state["nodes"],
+            "links": [{"source": l["source"], "target": l["target"]} for l in state["links"]],
+            "containers": dict(state["containers"]),
+            "link_loads": cls._link_loads(state),
+            "container_chains": state["container_chains"],
+            "active_chains": state["active_chains"],
+            "metrics": cls._metrics(state),
+        }
+
+    def subscribe(self, env, loop: asyncio.AbstractEventLoop) -> Subscriber:
+        sub = Subscriber(loop)
+        with self._lock:
+            snapshot = self.snapshot(env)
+            if not self.subscribers:
+                self._last_containers = dict(snapshot["containers"])
+                self._last_loads = dict(snapshot["link_loads"])
+            self.subscribers.add(sub)
+        sub.push(snapshot)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            self.subscribers.discard(sub)
+
+    def publish(self, env, state=None):
+        with self._lock:
+            if not self.subscribers:
+                return
+            if state is None:
+                state = env.get_current_state()
+            containers = state["containers"]
+            moved = {c: s for c, s in containers.items() if self._last_containers.get(c) != s}
+            loads = self._link_loads(state)
+            changed = {k: v for k, v in loads.items() if self._last_loads.get(k) != v}
+            self._last_containers = dict(containers)
+            self._last_loads = loads
+            message = {
+                "type": "delta",
+                "containers": moved,
+                "link_loads": changed,
+                "active_chains": state["active_chains"],
+                "metrics": self._metrics(state),
+            }
+            subscribers = list(self.subscribers)
+        for sub in subscribers:
+            sub.push(message)
+
+    def close(self):
+        with self._lock:
+            subscribers, self.subscribers = list(self.subscribers), set()
+        for sub in subscribers:
+            sub.push({"type": "closed"})
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+from stable_baselines3.common.vec_env import DummyVecEnv
+from ml.agent import BatchedVecEnv, RLAgent
+from ml.environment import DataCenterEnv
+
+@pytest.fixture(scope="module")
+def agent():
+    return RLAgent(DataCenterEnv(2, 2, 8, seed=0), n_envs=3, use_subprocess=False)
+
+def test_batched_vec_env_matches_dummy(agent):
+    batched = agent.make_training_env()
+    assert isinstance(batched, BatchedVecEnv)
+    for env in batched.envs:
+        assert env.unwrapped.obs_buffer.base is batched.buf_obs[None]
+    reference = DummyVecEnv([lambda env=env: env for env in agent.make_training_env().envs])
+    rng = np.random.default_rng(0)
+    np.testing.assert_allclose(batched.reset(), reference.reset(), rtol=1e-5, atol=1e-4)
+    for _ in range(20):
+        actions = np.stack([rng.integers(agent.env.action_space.nvec) for _ in range(batched.num_envs)])
+        obs, rewards, dones, infos = batched.step(actions)
+        expected_obs, expected_rewards, expected_dones, expected_infos = reference.step(actions)
+        np.testing.assert_allclose(obs, expected_obs, rtol=1e-5, atol=1e-4)
+        np.testing.assert_allclose(rewards, expected_rewards, rtol=1e-5)
+        assert [i["network_cost"] for i in infos] == pytest.approx([i["network_cost"] for i in expected_infos])
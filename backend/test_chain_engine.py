@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from simulation.chains import ChainEngine
+
+class ServiceChain:
+    # Per-chain state machine the array engine replaced; kept as the reference semantics.
+    def __init__(self, name, nodes, delays, volumes):
+        self.name = name
+        self.nodes = nodes
+        self.delays = delays
+        self.volumes = volumes
+        self.active = False
+        self.current_step_idx = -1
+        self.steps_since_last_trigger = 0
+
+    def start(self):
+        if not self.active:
+            self.active = True
+            self.current_step_idx = 0
+            self.steps_since_last_trigger = 0
+
+    def tick(self):
+        if not self.active:
+            return None
+        result = None
+        if self.current_step_idx < len(self.nodes) - 1:
+            target_delay = 0 if self.current_step_idx == 0 else self.delays[self.current_step_idx - 1]
+            if self.steps_since_last_trigger >= target_delay:
+                src = self.nodes[self.current_step_idx]
+                dst = self.nodes[self.current_step_idx + 1]
+                result = (src, dst, self.volumes[self.current_step_idx])
+                self.current_step_idx += 1
+                self.steps_since_last_trigger = 0
+            else:
+                self.steps_since_last_trigger += 1
+        else:
+            self.active = False
+        return result
+
+def random_definitions(rng, count=6, containers=20):
+    definitions = []
+    for i in range(count):
+        hops = int(rng.integers(1, 6))
+        nodes = [f"c{int(n)}" for n in rng.choice(containers, hops + 1, replace=False)]
+        definitions.append({
+            "name": f"chain-{i}",
+            "nodes": nodes,
+            "delays": [int(d) for d in rng.integers(0, 4, max(hops - 1, 0))],
+            "volumes": [float(v) for v in rng.uniform(1, 50, hops)],
+        })
+    return definitions
+
+@pytest.mark.parametrize("seed", range(5))
+def test_tick_matches_service_chain(seed):
+    rng = np.random.default_rng(seed)
+    index = {f"c{i}": i for i in range(20)}
+    definitions = random_definitions(rng)
+    engine = ChainEngine(definitions, index)
+    reference = [ServiceChain(d["name"], d["nodes"], d["delays"], d["volumes"]) for d in definitions]
+
+    for _ in range(200):
+        for i in np.flatnonzero(rng.random(len(reference)) < 0.1):
+            reference[i].start()
+            engine.start([i])
+        expected = sorted((index[s], index[d], v) for s, d, v in filter(None, (c.tick() for c in reference)))
+        src, dst, volume = engine.tick()
+        assert sorted(zip(src.tolist(), dst.tolist(), volume.tolist())) == expected
+        assert engine.active_names == [c.name for c in reference if c.active]
+
+def test_index_rejects_unknown_chain():
+    engine = ChainEngine([], {})
+    assert len(engine) == 0
+    with pytest.raises(ValueError):
+        engine.index("Login Flow")
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from simulation.cost import CostEngine
+from simulation.topology import build_topology
+from simulation.traffic import TrafficGenerator
+
+def make_engine(sparse_traffic: bool, kind: str = "tree", num_containers: int = 30, seed: int = 0, **params):
+    topology = build_topology(kind, seed=seed, **params)
+    topology.place_containers(num_containers)
+    gen = TrafficGenerator(num_containers, seed=seed, sparse_traffic=sparse_traffic)
+    for step in range(3):
+        gen.generate_temporal_traffic(step)
+    engine = CostEngine(topology)
+    engine.set_traffic(gen.get_traffic_array())
+    return engine
+
+def brute_force_cost(engine: CostEngine) -> float:
+    T = engine.traffic.toarray() if sparse.issparse(engine.traffic) else engine.traffic
+    D = np.asarray(engine.topology.distance_matrix, dtype=np.float64)
+    p = engine.topology.placement
+    return float((T * D[p[:, None], p[None, :]]).sum())
+
+def free_servers(engine: CostEngine) -> np.ndarray:
+    topo = engine.topology
+    return np.flatnonzero(topo.occupancy < topo.server_capacity)
+
+@pytest.mark.parametrize("sparse_traffic", [False, True])
+@pytest.mark.parametrize("kind,params", [("tree", {}), ("fat_tree", {"k": 4}), ("leaf_spine", {})])
+def test_apply_move_matches_recompute(sparse_traffic, kind, params):
+    engine = make_engine(sparse_traffic, kind, **params)
+    rng = np.random.default_rng(1)
+    for _ in range(25):
+        container = int(rng.integers(len(engine.topology.placement)))
+        server = int(rng.choice(free_servers(engine)))
+        engine.apply_move(container, server)
+        cost, colocated = engine.network_cost, engine.colocated_flows
+        engine.recompute()
+        assert cost == pytest.approx(engine.network_cost, rel=1e-6)
+        assert colocated == engine.colocated_flows
+
+@pytest.mark.parametrize("sparse_traffic", [False, True])
+def test_move_delta_matches_brute_force(sparse_traffic):
+    engine = make_engine(sparse_traffic)
+    topo = engine.topology
+    before = brute_force_cost(engine)
+    for container in range(0, len(topo.placement), 5):
+        deltas = engine.move_deltas(container)
+        for server in free_servers(engine):
+            old = int(topo.placement[container])
+            delta = engine.move_delta(container, int(server))
+            topo.placement[container] = server
+            expected = brute_force_cost(engine) - before
+            topo.placement[container] = old
+            assert delta == pytest.approx(expected, rel=1e-6, abs=1e-3)
+            assert deltas[server] == pytest.approx(expected, rel=1e-6, abs=1e-3)
+
+def test_link_weight_change_refreshes_cost():
+    engine = make_engine(False)
+    topo = engine.topology
+    u, v = topo.edges[0]
+    topo.set_link_weight(u, v, 50.0)
+    assert engine.network_cost == pytest.approx(brute_force_cost(engine), rel=1e-6)
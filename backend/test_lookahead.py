@@ -0,0 +1,34 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pytest
+from ml import lookahead
+from ml.environment import DataCenterEnv
+from ml.lookahead import LookaheadSearch
+
+class BrokenExecutor:
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+@pytest.fixture(scope="module")
+def env():
+    env = DataCenterEnv(2, 2, 8, seed=0)
+    env.reset(seed=0)
+    return env
+
+def test_broken_pool_falls_back_in_process(env, monkeypatch):
+    broken = BrokenExecutor()
+    monkeypatch.setitem(lookahead._executors, 2, broken)
+    expected = LookaheadSearch(env, workers=0, seed=0).decide(width=6, depth=2, time_budget=30)
+    action = LookaheadSearch(env, workers=2, seed=0).decide(width=6, depth=2, time_budget=30)
+    np.testing.assert_array_equal(action, expected)
+    assert broken.shut_down
+    assert lookahead._executors.get(2) is not broken
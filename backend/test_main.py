@@ -0,0 +1,89 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import pytest
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def request(url, method="GET"):
+    with urllib.request.urlopen(urllib.request.Request(url, method=method), timeout=60) as response:
+        return response.status, json.loads(response.read().decode())
+
+@pytest.fixture
+def server(tmp_path):
+    def start(**env_vars):
+        port = free_port()
+        env = dict(os.environ, PORT=str(port), TRAIN_ENVS="1", INFERENCE_BACKEND="eager")
+        env.update(env_vars)
+        proc = subprocess.Popen([sys.executable, MAIN], cwd=tmp_path, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        procs.append(proc)
+        base = f"http://127.0.0.1:{port}/api"
+        deadline = time.time() + 180
+        while time.time() < deadline:
+            if proc.poll() is not None:
+                pytest.fail(f"server exited early:\n{proc.stdout.read()}")
+            try:
+                request(f"{base}/startup")
+                return base, proc
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.5)
+        pytest.fail("server did not start")
+
+    procs = []
+    yield start
+    for proc in procs:
+        proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+def test_import_does_no_startup_work():
+    code = "import main; assert main.env is None and main.pool is None and main.default_session is None"
+    subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(MAIN), check=True, timeout=120)
+
+def test_session_with_worker_processes(server):
+    base, proc = server(SESSION_WORKERS="1")
+    status, body = request(f"{base}/sessions", "POST")
+    assert status == 200
+    session_id = body["session_id"]
+    status, body = request(f"{base}/sessions")
+    assert [s["id"] for s in body["sessions"]] == [session_id]
+    proc.terminate()
+    output = proc.communicate(timeout=30)[0]
+    assert output.count("Startup:") == 1
+
+def test_subprocess_training_does_not_restart_server(server):
+    base, proc = server(TRAIN_ENVS="2")
+    status, job = request(f"{base}/train?timesteps=256", "POST")
+    deadline = time.time() + 300
+    while job["status"] in ("pending", "running") and time.time() < deadline:
+        time.sleep(1)
+        status, job = request(f"{base}/train/{job['job_id']}")
+    assert job["status"] == "completed"
+    proc.terminate()
+    output = proc.communicate(timeout=30)[0]
+    assert output.count("Startup:") == 1
+
+def test_lookahead_with_worker_processes(server):
+    base, proc = server(LOOKAHEAD_WORKERS="2")
+    for _ in range(2):
+        status, body = request(f"{base}/optimize?optimizer=lookahead&steps=2&width=4", "POST")
+        assert status == 200
+
+def test_optimize_rejects_negative_steps():
+    from fastapi.testclient import TestClient
+    import main
+    response = TestClient(main.app).post("/api/optimize", params={"steps": -3})
+    assert response.status_code == 400
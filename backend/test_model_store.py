@@ -0,0 +1,38 @@
+import json
+import os
+import pytest
+from ml.model_store import ModelStore, atomic_write
+from simulation.chains import DEFAULT_CHAINS_PATH
+from simulation.traffic import TrafficGenerator
+
+def test_atomic_write_replaces_file(tmp_path):
+    path = tmp_path / "meta.json"
+    path.write_text("old")
+    with atomic_write(str(path), "w") as f:
+        f.write("new")
+    assert path.read_text() == "new"
+    assert os.listdir(tmp_path) == ["meta.json"]
+
+def test_atomic_write_keeps_old_file_on_error(tmp_path):
+    path = tmp_path / "predictor.ts"
+    path.write_bytes(b"old")
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path)) as f:
+            f.write(b"partial")
+            raise RuntimeError("export failed")
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["predictor.ts"]
+
+def key(**traffic_kwargs):
+    traffic = TrafficGenerator(20, seed=0, **traffic_kwargs)
+    return ModelStore.key_for(4, 4, 20, 5, None, traffic_fingerprint=traffic.fingerprint())
+
+def test_key_tracks_traffic_config(tmp_path):
+    with open(DEFAULT_CHAINS_PATH) as f:
+        config = json.load(f)
+    config["chains"][0]["volumes"][0] *= 2
+    chains_path = tmp_path / "chains.json"
+    chains_path.write_text(json.dumps(config))
+    assert key() == key(chains_path=DEFAULT_CHAINS_PATH)
+    assert key() != key(chains_path=str(chains_path))
+    assert key() != key(sparse_traffic=True)
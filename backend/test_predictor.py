@@ -0,0 +1,43 @@
+import copy
+import numpy as np
+import pytest
+from ml.environment import DataCenterEnv
+from ml.predictor import TrafficPredictor
+
+@pytest.fixture(scope="module")
+def env():
+    return DataCenterEnv(2, 2, 8, seed=0)
+
+def traffic_maps(env, steps):
+    gen = copy.deepcopy(env.traffic_gen)
+    maps = []
+    for step in range(steps):
+        gen.generate_temporal_traffic(step)
+        maps.append(gen.get_traffic())
+    return maps
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_predict_many_matches_predict(env, compiled):
+    source = env.predictor
+    if compiled:
+        source = copy.deepcopy(source)
+        source.compile()
+    maps = traffic_maps(env, 12)
+    batched, single = [], []
+    for predictors in (batched, single):
+        for _ in range(3):
+            predictor = TrafficPredictor(env.num_containers, history_len=env.predictor.history_len)
+            predictor.load_state(env.predictor.get_state())
+            predictors.append(predictor)
+         
+        predictors[1].reset()
+        predictors[2].reset()
+    for step in range(len(maps) - 2):
+        per_env = [maps[step + i] for i in range(3)]
+        results = source.predict_many(batched, per_env, [step] * 3)
+        for predictor, traffic, (pred, q) in zip(single, per_env, results):
+            expected_pred, expected_q = predictor.predict(traffic, step=step)
+            np.testing.assert_allclose(pred, expected_pred, rtol=1e-5, atol=1e-4)
+            np.testing.assert_allclose(q, expected_q)
+        again = source.predict_many(batched, per_env, [step] * 3)
+        assert all(a is b for a, b in zip(again, results))
@@ -0,0 +1,15 @@
+import pytest
+from sessions import TickBudget, TickBudgetExceeded
+
+@pytest.mark.parametrize("rate", [None, 10.0])
+def test_take_rejects_negative_ticks(rate):
+    budget = TickBudget(rate, burst=5)
+    with pytest.raises(ValueError):
+        budget.take(-3)
+    assert budget.tokens == 5
+
+def test_take_spends_tokens():
+    budget = TickBudget(1e-9, burst=5)
+    budget.take(4)
+    with pytest.raises(TickBudgetExceeded):
+        budget.take(2)
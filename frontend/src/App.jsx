@@ -1,7 +1,10 @@
 import React, { useState, useEffect } from 'react';
 import NetworkGraph from './components/NetworkGraph';
 import MetricsPanel from './components/MetricsPanel';
-import { getNetworkState, resetSimulation, optimizeNetwork, triggerBurst, forceChain } from './api';
+import {
+  getNetworkState, resetSimulation, optimizeNetwork, triggerBurst, forceChain,
+  startAutoplay, pauseAutoplay, setAutoplaySpeed, subscribeNetworkState
+} from './api';
 import { Play, Pause, RotateCcw, Activity, Zap } from 'lucide-react';
 import './App.css';
 
@@ -11,6 +14,7 @@ function App() {
   const [loading, setLoading] = useState(false);
   const [optimizationStep, setOptimizationStep] = useState(0);
   const [isPlaying, setIsPlaying] = useState(false);
+  const [tickRate, setTickRate] = useState(5);
 
   useEffect(() => {
     fetchState();
@@ -18,14 +22,71 @@ function App() {
 
 
   useEffect(() => {
-    let timer;
-    if (isPlaying && !loading) {
-      timer = setTimeout(() => {
-        handleOptimize();
-      }, 800);
+    if (!isPlaying) return;
+    return subscribeNetworkState(applyStreamMessage);
+  }, [isPlaying]);
+
+  const applyStreamMessage = (message) => {
+    setNetworkData(prev => {
+      if (message.type === 'snapshot' || !prev) {
+        const loads = message.link_loads || {};
+        return {
+          ...prev,
+          nodes: message.nodes,
+          links: message.links.map(l => ({ ...l, load: loads[`${l.source}|${l.target}`] || 0 })),
+          containers: message.containers,
+          container_chains: message.container_chains,
+          active_chains: message.active_chains,
+          step: message.metrics.step
+        };
+      }
+      const loads = message.link_loads;
+      const key = l => `${typeof l.source === 'object' ? l.source.id : l.source}|${typeof l.target === 'object' ? l.target.id : l.target}`;
+      return {
+        ...prev,
+        links: prev.links.map(l => (key(l) in loads ? { ...l, load: loads[key(l)] } : l)),
+        containers: { ...prev.containers, ...message.containers },
+        active_chains: message.active_chains,
+        step: message.metrics.step
+      };
+    });
+    setMetricsHistory(prev => [
+      ...prev.slice(-199),
+      {
+        step: message.metrics.step,
+        cost: message.metrics.network_cost,
+        energy_cost: 0,
+        active_servers: message.metrics.active_servers,
+        active_chains: message.active_chains
+      }
+    ]);
+    setOptimizationStep(message.metrics.step);
+  };
+
+  const handleTogglePlay = async () => {
+    try {
+      if (isPlaying) {
+        await pauseAutoplay();
+      } else {
+        await startAutoplay(tickRate);
+      }
+      setIsPlaying(!isPlaying);
+    } catch (error) {
+      console.error("Failed to toggle autoplay:", error);
     }
-    return () => clearTimeout(timer);
-  }, [isPlaying, loading]);
+  };
+
+  const handleSpeedChange = async (event) => {
+    const rate = Number(event.target.value);
+    setTickRate(rate);
+    if (isPlaying) {
+      try {
+        await setAutoplaySpeed(rate);
+      } catch (error) {
+        console.error("Failed to change speed:", error);
+      }
+    }
+  };
 
   const fetchState = async () => {
     try {
@@ -101,13 +162,19 @@ function App() {
           </button>
 
           <button
-            onClick={() => setIsPlaying(!isPlaying)}
+            onClick={handleTogglePlay}
             className="btn btn-secondary"
             title={isPlaying ? "Pause Simulation" : "Auto-Run Simulation"}
           >
             {isPlaying ? "Pause" : "Play"}
           </button>
 
+          <select value={tickRate} onChange={handleSpeedChange} className="btn btn-secondary" title="Ticks per second">
+            {[1, 2, 5, 10, 20, 50].map(rate => (
+              <option key={rate} value={rate}>{rate}/s</option>
+            ))}
+          </select>
+
           <button onClick={handleOptimize} disabled={loading || isPlaying} className="btn btn-secondary" title="Step Forward">
             Step +5
           </button>
@@ -28,3 +28,28 @@ export const forceChain = async () => {
     const response = await axios.post(`${API_URL}/force_chain`);
     return response.data;
 };
+
+export const startAutoplay = async (tickRate) => {
+    const response = await axios.post(`${API_URL}/autoplay/start`, null, {
+        params: { tick_rate: tickRate }
+    });
+    return response.data;
+};
+
+export const pauseAutoplay = async () => {
+    const response = await axios.post(`${API_URL}/autoplay/pause`);
+    return response.data;
+};
+
+export const setAutoplaySpeed = async (tickRate) => {
+    const response = await axios.post(`${API_URL}/autoplay/speed`, null, {
+        params: { tick_rate: tickRate }
+    });
+    return response.data;
+};
+
+export const subscribeNetworkState = (onMessage) => {
+    const socket = new WebSocket(`${API_URL.replace(/^http/, 'ws')}/ws`);
+    socket.onmessage = (event) => onMessage(JSON.parse(event.data));
+    return () => socket.close();
+};